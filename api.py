@@ -3,24 +3,82 @@
 import matplotlib
 matplotlib.use("Agg")
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 
 import numpy as np
 import math
+import os
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
 from urllib.parse import unquote
 
+from pydantic import BaseModel, Field
+
 from fastapi.responses import JSONResponse
 import pandas as pd
 
-from helpers.pickle_helpers import load_pickle
+from helpers.pickle_helpers import load_pickle, PROJECT_ROOT
+from helpers.data_cube import as_cube, STATS as AGGREGATE_STATS
 from helpers.data_filter import filter_to_eu_only
-from charts.contribution_bar_chart import plot_contribution_bar_chart, build_contribution_bar_title
-from charts.time_line_graph import plot_time_line_graph, build_timeline_title
-from charts.score_card import get_score_card_values, build_score_card_title
+from helpers.country_dimension import build_country_dimension
+from helpers.country_groups import CountryGroup, GroupRegistry, load_country_groups
+from helpers.query import QueryEngine, AGGREGATES as QUERY_AGGREGATES, MAX_LIMIT as QUERY_MAX_LIMIT
+from charts.contribution_bar_chart import build_contribution_bar_title
+from charts.time_line_graph import build_timeline_title
+from charts.score_card import get_score_card_values, build_score_card_title, ranking_index, EU_SCOPE, SCOPES, SCORE as SCORE_METRIC, cube_metric
 from charts.donut_data import compute_factor_donut
 from charts.map_data import build_map_payload
+from charts.render_service import ChartRenderer, ChartSpec, CONTRIB_BAR, CONTRIB_YEARS, TIMELINE, MATPLOTLIB, MEDIA_TYPES, DEFAULT_FORMAT, negotiate_format, requested_dpi
+from charts.render_pool import ProcessRenderPool
+from charts.prewarm import chart_permutations, prewarm
+from charts.prefetch import Prefetcher
+from charts.chart_batch import render_batch, build_zip, build_multipart
+from charts.sparklines import SparklineSheets
+from charts.chart_data import contribution_bar_data, timeline_data
+from charts.choropleth import ChoroplethBase, ChoroplethRenderer, SCORE, ABSOLUTE
+from charts.pil_charts import PIL_FORMATS
+
+# "eu" serves the EU member states only; "world" keeps every country in the
+# pickle, ranked worldwide and within their regions
+DATASET_SCOPE = os.getenv("DATASET_SCOPE", EU_SCOPE)
+
+# Max number of rendered chart images kept in memory
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+
+# "thread" renders in FastAPI's threadpool, "process" uses a warm worker pool
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "thread")
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", "0")) or None  # None = one per core
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "10"))
+
+# Max /query results kept in memory
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+
+# Palette-quantize PNGs once before caching them (smaller, slower first render)
+PNG_OPTIMIZE = os.getenv("PNG_OPTIMIZE", "0") == "1"
+
+# Default chart engine ("matplotlib" or "pil"); requests can override with ?engine=
+CHART_ENGINE = os.getenv("CHART_ENGINE", MATPLOTLIB)
+
+# Render every chart permutation at startup: "off", "startup" (blocks until
+# done) or "background" (serve immediately, warm in a thread)
+PREWARM = os.getenv("PREWARM", "off")
+
+# Background threads rendering the likely next views of a country (0 = off)
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "1"))
+
+# EU geometry for /map images (written by scripts/make_eu_geojson.py)
+MAP_GEOJSON = os.getenv("MAP_GEOJSON", str(PROJECT_ROOT / "public" / "eu.geojson"))
+
+# Named country groups for ?group= overlays ({"Nordics": ["Denmark", ...]})
+COUNTRY_GROUPS_FILE = os.getenv("COUNTRY_GROUPS_FILE", str(PROJECT_ROOT / "data" / "country_groups.json"))
+
+# Parallel renders per /charts/batch request, and max charts per batch
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_MAX_CHARTS = int(os.getenv("BATCH_MAX_CHARTS", "100"))
 
 app = FastAPI()
 
@@ -38,10 +96,106 @@ app.add_middleware(
 
 @app.on_event("startup")
 def load_data():
+    if DATASET_SCOPE not in SCOPES:
+        raise ValueError(f"DATASET_SCOPE must be one of {list(SCOPES)}, not '{DATASET_SCOPE}'")
     df = load_pickle("wh")
-    df = filter_to_eu_only(df)
+    try:
+        countries = load_pickle("countries")
+    except FileNotFoundError:  # pickle from before the ETL wrote the dimension table
+        df, countries = build_country_dimension(df)
+    if DATASET_SCOPE == EU_SCOPE:
+        df = filter_to_eu_only(df)
     app.state.wh = df
+    app.state.cube = as_cube(df)
+    app.state.countries = countries[countries["country"].astype(str).isin(app.state.cube.countries)]
     app.state.map_payload = build_map_payload(df)
+    app.state.rankings = ranking_index(df, DATASET_SCOPE)
+    app.state.groups = GroupRegistry(app.state.cube, load_country_groups(COUNTRY_GROUPS_FILE))
+    app.state.queries = QueryEngine(df, app.state.groups, cache_size=QUERY_CACHE_SIZE)
+
+    pool = None
+    if RENDER_BACKEND == "process":
+        pool = ProcessRenderPool(df, size=RENDER_POOL_SIZE, timeout=RENDER_TIMEOUT)
+        pool.warm()
+    # Prewarming needs room for every permutation, or it evicts itself
+    specs = chart_permutations(df, engine=CHART_ENGINE) if PREWARM in ("startup", "background") else []
+    cache_size = max(RENDER_CACHE_SIZE, len(specs))
+
+    app.state.charts = ChartRenderer(
+        df,
+        cache_size=cache_size,
+        pool=pool,
+        optimize_png=PNG_OPTIMIZE,
+    )
+
+    app.state.sparklines = SparklineSheets(df)
+
+    # Map images are optional: without the geometry, /map answers 503
+    app.state.choropleth = None
+    if Path(MAP_GEOJSON).is_file():
+        app.state.choropleth = ChoroplethRenderer(app.state.map_payload, ChoroplethBase(Path(MAP_GEOJSON)))
+
+    app.state.batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="chart-batch")
+
+    app.state.prefetch = None
+    if PREFETCH_WORKERS > 0:
+        app.state.prefetch = Prefetcher(app.state.charts, workers=PREFETCH_WORKERS)
+
+    app.state.prewarm = {"mode": PREWARM}
+    if specs:
+        sizing = {"cache_size": cache_size, "configured_cache_size": RENDER_CACHE_SIZE}
+
+        def _run():
+            app.state.prewarm = {"mode": PREWARM, "status": "running", **sizing}
+            summary = prewarm(app.state.charts, specs)
+            app.state.prewarm = {"mode": PREWARM, "status": "done", **sizing, **summary}
+
+        if PREWARM == "startup":
+            _run()
+        else:
+            threading.Thread(target=_run, name="chart-prewarm", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_render_pool():
+    app.state.batch_executor.shutdown(wait=False, cancel_futures=True)
+    if app.state.prefetch is not None:
+        app.state.prefetch.shutdown()
+    if app.state.charts.pool is not None:
+        app.state.charts.pool.shutdown()
+
+def _country(name: str) -> str:
+    """The dataset's name for a requested country: any case, alias or ISO2 code."""
+    name = unquote(name)
+    resolved = app.state.cube.resolver.resolve(name)
+    if resolved is None:
+        raise HTTPException(status_code=400, detail=app.state.cube.resolver.unknown(name.strip()))
+    return resolved
+
+def _overlay(group: str | None, weighted: bool = False) -> CountryGroup | None:
+    """?group=Nordics[&weighted=true] as a chart overlay; None keeps the EU average."""
+    if not group:
+        return None
+    try:
+        return app.state.groups.resolve(unquote(group).strip(), weighted)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _chart_response(spec: ChartSpec) -> Response:
+    try:
+        spec = spec.normalized()
+        data = app.state.charts.get(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if app.state.prefetch is not None:
+        app.state.prefetch.on_request(spec)
+
+    # Format can come from the Accept header, so shared caches must key on it
+    return Response(content=data, media_type=spec.media_type, headers={"Vary": "Accept"})
 
 @app.get("/data")
 def get_data():
@@ -62,21 +216,138 @@ def contrib_bar(
     year: int,
     show_eu: bool = Query(False),
     fixed_scale: bool = Query(False),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
+    engine: str | None = Query(None),
+    fmt: str | None = Query(None, alias="format"),
+    width: int | None = Query(None, gt=0),
+    height: int | None = Query(None, gt=0),
+    dpi: int | None = Query(None, gt=0),
+    accept: str | None = Header(None),
+):
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
+
+    spec = ChartSpec(
+        CONTRIB_BAR, geo_area, year=year, show_eu=show_eu or overlay is not None, fixed_scale=fixed_scale,
+        engine=engine or CHART_ENGINE,
+        fmt=negotiate_format(accept, fmt),
+        dpi=requested_dpi(CONTRIB_BAR, width, height, dpi),
+        overlay=overlay,
+    )
+    return _chart_response(spec)
+
+@app.get("/contrib_bar_years/{geo_area}")
+def contrib_bar_years(
+    geo_area: str,
+    show_eu: bool = Query(False),
+    fixed_scale: bool = Query(False),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
+    fmt: str | None = Query(None, alias="format"),
+    width: int | None = Query(None, gt=0),
+    height: int | None = Query(None, gt=0),
+    dpi: int | None = Query(None, gt=0),
+    accept: str | None = Header(None),
 ):
-    geo_area = unquote(geo_area)
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
+
+    spec = ChartSpec(
+        CONTRIB_YEARS, geo_area, show_eu=show_eu or overlay is not None, fixed_scale=fixed_scale,
+        engine=MATPLOTLIB,
+        fmt=negotiate_format(accept, fmt),
+        dpi=requested_dpi(CONTRIB_YEARS, width, height, dpi),
+        overlay=overlay,
+    )
+    return _chart_response(spec)
+
+class BatchChart(BaseModel):
+    type: Literal["contrib_bar", "timeline", "contrib_bar_years"]
+    geo_area: str
+    year: int | None = None
+    show_eu: bool = False
+    fixed_scale: bool = False
+    engine: str | None = None
+    format: str = "png"
+    width: int | None = Field(None, gt=0)
+    height: int | None = Field(None, gt=0)
+    dpi: int | None = Field(None, gt=0)
+    compare: list[str] = []
+    group: str | None = None
+    weighted: bool = False
+
+class BatchRequest(BaseModel):
+    charts: list[BatchChart]
+    container: Literal["zip", "multipart"] = "zip"
+
+@app.post("/charts/batch")
+def charts_batch(req: BatchRequest):
+    if not req.charts:
+        raise HTTPException(status_code=400, detail="No charts requested")
+    if len(req.charts) > BATCH_MAX_CHARTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_CHARTS} charts per batch")
+
+    # Unknown countries stay as sent and fail in their own manifest entry
+    resolver = app.state.cube.resolver
+    specs = []
+    for c in req.charts:
+        overlay = _overlay(c.group, c.weighted)
+        specs.append(ChartSpec(
+            c.type,
+            resolver.resolve(c.geo_area) or c.geo_area,
+            year=c.year,
+            show_eu=c.show_eu or overlay is not None,
+            fixed_scale=c.fixed_scale,
+            engine=c.engine or CHART_ENGINE,
+            fmt=c.format,
+            dpi=requested_dpi(c.type, c.width, c.height, c.dpi),
+            compare=tuple(resolver.resolve(name) or name for name in c.compare),
+            overlay=overlay,
+        ))
+    items = render_batch(app.state.charts, specs, app.state.batch_executor)
+
+    if req.container == "multipart":
+        body, boundary = build_multipart(items)
+        return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+
+    return Response(
+        content=build_zip(items),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="charts.zip"'},
+    )
 
+@app.get("/sparklines")
+def sparklines(
+    show_eu: bool = Query(False),
+    fixed_scale: bool = Query(False),
+    scale: int = Query(1),
+    fmt: str | None = Query(None, alias="format"),
+    accept: str | None = Header(None),
+):
+    # Raster only: an Accept-negotiated SVG falls back to PNG, an explicit one is a 400
+    if fmt is None:
+        fmt = negotiate_format(accept)
+        if fmt not in PIL_FORMATS:
+            fmt = DEFAULT_FORMAT
+    fmt = fmt.lower()
     try:
-        buf = plot_contribution_bar_chart(
-            app.state.wh,
-            geo_area=geo_area,
-            year=year,
-            show_eu=show_eu,
-            fixed_scale=fixed_scale,
-        )
+        data, _ = app.state.sparklines.get(show_eu, fixed_scale, fmt, scale)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=data, media_type=MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
 
-    return StreamingResponse(buf, media_type="image/png")
+@app.get("/sparklines/index")
+def sparklines_index(
+    show_eu: bool = Query(False),
+    fixed_scale: bool = Query(False),
+    scale: int = Query(1),
+):
+    try:
+        _, index = app.state.sparklines.get(show_eu, fixed_scale, "png", scale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return index
 
 @app.get("/contrib_bar_meta/{geo_area}/{year}")
 def contrib_bar_meta(
@@ -84,58 +355,261 @@ def contrib_bar_meta(
     year: int,
     show_eu: bool = Query(False),
     fixed_scale: bool = Query(False),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
 ):
-    geo_area = unquote(geo_area)
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
     return {
-        "title": build_contribution_bar_title(geo_area, year, show_eu),
+        "title": build_contribution_bar_title(geo_area, year, show_eu or overlay is not None, overlay),
     }
 
+def _compare_list(compare: list[str]) -> tuple[str, ...]:
+    """?compare=France&compare=Italy or ?compare=France,Italy"""
+    return tuple(_country(name) for value in compare for name in unquote(value).split(",") if name.strip())
+
 @app.get("/timeline/{geo_area}")
 def timeline(
     geo_area: str,
     show_eu: bool = Query(False),
     fixed_scale: bool = Query(False),
+    compare: list[str] = Query([]),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
+    engine: str | None = Query(None),
+    fmt: str | None = Query(None, alias="format"),
+    width: int | None = Query(None, gt=0),
+    height: int | None = Query(None, gt=0),
+    dpi: int | None = Query(None, gt=0),
+    accept: str | None = Header(None),
 ):
-    geo_area = unquote(geo_area)
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
+
+    spec = ChartSpec(
+        TIMELINE, geo_area, show_eu=show_eu or overlay is not None, fixed_scale=fixed_scale,
+        engine=engine or CHART_ENGINE,
+        fmt=negotiate_format(accept, fmt),
+        dpi=requested_dpi(TIMELINE, width, height, dpi),
+        compare=_compare_list(compare),
+        overlay=overlay,
+    )
+    return _chart_response(spec)
 
+@app.get("/timeline_meta/{geo_area}")
+def timeline_meta(
+    geo_area: str,
+    show_eu: bool = Query(False),
+    fixed_scale: bool = Query(False),
+    compare: list[str] = Query([]),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
+):
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
     try:
-        buf = plot_time_line_graph(
-            app.state.wh,
-            geo_area=geo_area,
-            show_eu=show_eu,
-            fixed_scale=fixed_scale,
-        )
+        spec = ChartSpec(TIMELINE, geo_area, compare=_compare_list(compare)).normalized()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "title": build_timeline_title(spec.geo_area, show_eu or overlay is not None, fixed_scale, spec.compare, overlay),
+    }
 
-    return StreamingResponse(buf, media_type="image/png")
+@app.get("/contrib_bar_data/{geo_area}/{year}")
+def contrib_bar_data(
+    geo_area: str,
+    year: int,
+    show_eu: bool = Query(False),
+    fixed_scale: bool = Query(False),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
+):
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
+    try:
+        return contribution_bar_data(app.state.wh, geo_area, year, show_eu or overlay is not None, fixed_scale, overlay)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/timeline_meta/{geo_area}")
-def timeline_meta(
+@app.get("/timeline_data/{geo_area}")
+def timeline_chart_data(
     geo_area: str,
     show_eu: bool = Query(False),
     fixed_scale: bool = Query(False),
+    compare: list[str] = Query([]),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
 ):
-    geo_area = unquote(geo_area)
-    return {
-        "title": build_timeline_title(geo_area, show_eu, fixed_scale),
-    }
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
+    try:
+        spec = ChartSpec(TIMELINE, geo_area, compare=_compare_list(compare)).normalized()
+        return timeline_data(app.state.wh, spec.geo_area, show_eu or overlay is not None, fixed_scale, spec.compare, overlay)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/score_card_meta/{geo_area}/{year}")
 def score_card_meta(
     geo_area: str,
     year: int,
     show_eu: bool = Query(False),
+    group: str | None = Query(None),
+    weighted: bool = Query(False),
 ):
-    geo_area = unquote(geo_area)
+    geo_area = _country(geo_area)
+    overlay = _overlay(group, weighted)
 
-    vals = get_score_card_values(app.state.wh, geo_area, year)
+    try:
+        vals = get_score_card_values(app.state.wh, geo_area, year, app.state.rankings, overlay)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "title": build_score_card_title(geo_area, year, show_eu),
         **vals,
     }
 
+@app.get("/rankings/{year}")
+def rankings(
+    year: int,
+    metric: str = Query("score"),
+    order: Literal["desc", "asc"] = Query("desc"),
+    region: str | None = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+):
+    try:
+        return app.state.rankings.table(year, metric, order == "desc", region, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/aggregates/{year}")
+def aggregates(
+    year: int,
+    group: str = Query("EU"),
+):
+    cube = app.state.cube
+    store = cube.aggregates
+    try:
+        return {
+            "group": group,
+            "year": year,
+            "countries": store.counts.get(group),
+            "metrics": {
+                m: {stat: store.value(group, year, m, stat) for stat in AGGREGATE_STATS}
+                for m in cube.metrics
+            },
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/countries")
+def list_countries():
+    dim = app.state.countries
+    return [
+        {
+            "country_id": int(row.country_id),
+            "country": str(row.country),
+            "iso2": None if pd.isna(row.iso2) else row.iso2,
+            "region": None if pd.isna(row.region) else str(row.region),
+            "is_eu": bool(row.is_eu),
+        }
+        for row in dim.itertuples(index=False)
+    ]
+
+@app.get("/countries/resolve/{name}")
+def resolve_country(name: str, limit: int = Query(5, ge=1, le=20)):
+    resolver = app.state.cube.resolver
+    name = unquote(name)
+    country = resolver.resolve(name)
+    return {
+        "query": name,
+        "country": country,
+        "iso2": resolver.iso2(name) if country is not None else None,
+        "suggestions": [] if country is not None else resolver.suggest(name, limit),
+    }
+
+@app.get("/regions/{year}")
+def regions(
+    year: int,
+    metric: str = Query(SCORE_METRIC),
+):
+    cube = app.state.cube
+    store = cube.aggregates
+    index = app.state.rankings
+    try:
+        ranking = index.ranking(year, metric)
+        out = []
+        for region in index.region_names:
+            order = ranking.by_region[region]
+            leader = index.countries[order[0]] if len(order) else None
+            out.append({
+                "region": region,
+                "countries": store.counts.get(region),
+                **{stat: store.value(region, year, cube_metric(metric), stat) for stat in AGGREGATE_STATS},
+                "leader": leader,
+            })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"year": year, "metric": metric, "scope": index.scope, "regions": out}
+
+class QueryFilter(BaseModel):
+    field: str
+    op: Literal[">", ">=", "<", "<=", "==", "!="] = ">"
+    value: float | str
+    weighted: bool = False
+
+class QueryRequest(BaseModel):
+    select: list[str] = []
+    filter: list[QueryFilter] = []
+    within: str | None = None
+    countries: list[str] = []
+    group_by: Literal["region"] | None = None
+    aggregate: Literal[QUERY_AGGREGATES] = "mean"
+    sort: str | None = None
+    order: Literal["desc", "asc"] | None = None
+    offset: int = Field(0, ge=0)
+    limit: int = Field(50, ge=1, le=QUERY_MAX_LIMIT)
+
+@app.post("/query")
+def query(req: QueryRequest):
+    engine = app.state.queries
+    try:
+        return engine.run(engine.normalize(req.model_dump()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/query/stats")
+def query_stats():
+    return app.state.queries.stats()
+
+@app.get("/groups")
+def list_groups():
+    groups = app.state.groups
+    return [groups.describe(name) for name in groups.names()]
+
+class GroupDefinition(BaseModel):
+    name: str
+    members: list[str]
+
+@app.post("/groups")
+def define_group(body: GroupDefinition):
+    try:
+        return app.state.groups.define(body.name, body.members)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/groups/{name}/aggregates/{year}")
+def group_aggregates(
+    name: str,
+    year: int,
+    weighted: bool = Query(False),
+):
+    try:
+        return {"year": year, **app.state.groups.aggregates(unquote(name), year, weighted)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/donut/{factor}/{year}")
 def donut_data(
     factor: str,
@@ -152,14 +626,42 @@ def donut_data(
         group_other=group_other,
     )
 
+@app.get("/map/{year}")
+def map_image(
+    year: int,
+    metric: str = Query(SCORE),
+    mode: str = Query(ABSOLUTE),
+    fmt: str | None = Query(None, alias="format"),
+    accept: str | None = Header(None),
+):
+    if app.state.choropleth is None:
+        raise HTTPException(status_code=503, detail=f"Map geometry not available ({MAP_GEOJSON} missing)")
+
+    if fmt is None:
+        fmt = negotiate_format(accept)
+        if fmt not in PIL_FORMATS:
+            fmt = DEFAULT_FORMAT
+    fmt = fmt.lower()
+
+    try:
+        data = app.state.choropleth.get(year, metric, mode, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=data, media_type=MEDIA_TYPES[fmt], headers={"Vary": "Accept"})
+
 @app.get("/map_data")
 def map_data():
     return app.state.map_payload
 
+@app.get("/render_cache/stats")
+def render_cache_stats():
+    prefetch = app.state.prefetch.stats() if app.state.prefetch is not None else None
+    return {**app.state.charts.stats(), "prewarm": app.state.prewarm, "prefetch": prefetch}
+
 
 @app.get("/debug/factor_values/{country}/{factor}/{year}")
 def debug_factor_values(country: str, factor: str, year: int):
-    df = app.state.wh.copy()
+    df = app.state.wh
 
     year_str = str(year)
     if len(year_str) == 4:
@@ -173,17 +675,13 @@ def debug_factor_values(country: str, factor: str, year: int):
             content={"error": f"Missing column {value_col}", "available_columns_sample": list(df.columns)[:40]},
         )
 
-    df = df[df["country"].notna()].copy()
-    df["country"] = df["country"].astype(str).str.strip()
-
-    c = country.strip()
-    rows = df[df["country"] == c].copy()
-
-    if rows.empty:
+    cube = app.state.cube
+    c = cube.resolver.resolve(country)
+    if c is None:
         # helpful: show close matches
-        matches = df["country"].dropna().unique().tolist()
-        maybe = [m for m in matches if c.lower() in m.lower()][:20]
-        return {"error": f"No rows for country={c}", "maybe": maybe}
+        return {"error": f"No rows for country={country.strip()}", "maybe": cube.resolver.suggest(country, limit=20)}
+
+    rows = df.loc[cube.country_rows(c)]
 
     raw = rows[value_col]
 
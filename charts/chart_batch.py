@@ -0,0 +1,105 @@
+# charts/chart_batch.py
+#
+# Many chart images in one response. Specs render in parallel through the
+# shared ChartRenderer (so cached images are reused and duplicates coalesce),
+# then get packed into a zip or a multipart/mixed body.
+
+import json
+import re
+import uuid
+import zipfile
+from concurrent.futures import Executor
+from io import BytesIO
+from typing import Any, NamedTuple
+
+from charts.render_service import ChartRenderer, ChartSpec, CONTRIB_BAR
+
+
+class BatchItem(NamedTuple):
+    spec: ChartSpec
+    data: bytes | None
+    error: str | None
+
+
+def _filename(index: int, spec: ChartSpec) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", "-vs-".join([spec.geo_area, *spec.compare])).strip("-") or "chart"
+    parts = [f"{index:03d}", spec.kind, slug]
+    if spec.kind == CONTRIB_BAR:
+        parts.append(str(spec.year))
+    if spec.show_eu:
+        parts.append("eu")
+    if spec.fixed_scale:
+        parts.append("fixed")
+    return "_".join(parts) + f".{spec.fmt}"
+
+
+def render_batch(renderer: ChartRenderer, specs: list[ChartSpec], executor: Executor) -> list[BatchItem]:
+    """Render specs in parallel; a failed spec is reported, not raised."""
+
+    def _one(spec: ChartSpec) -> BatchItem:
+        try:
+            spec = spec.normalized()
+            return BatchItem(spec, renderer.get(spec), None)
+        except (ValueError, TimeoutError, RuntimeError) as e:
+            return BatchItem(spec, None, str(e))
+
+    return list(executor.map(_one, specs))
+
+
+def _manifest(items: list[BatchItem]) -> list[dict[str, Any]]:
+    return [
+        {
+            "index": i,
+            "type": item.spec.kind,
+            "geo_area": item.spec.geo_area,
+            "compare": list(item.spec.compare),
+            "year": item.spec.year,
+            "show_eu": item.spec.show_eu,
+            "fixed_scale": item.spec.fixed_scale,
+            "format": item.spec.fmt,
+            "filename": _filename(i, item.spec) if item.data is not None else None,
+            "bytes": len(item.data) if item.data is not None else None,
+            "error": item.error,
+        }
+        for i, item in enumerate(items)
+    ]
+
+
+def build_zip(items: list[BatchItem]) -> bytes:
+    """Images stored uncompressed (they already are), plus manifest.json."""
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("manifest.json", json.dumps(_manifest(items), indent=2))
+        for i, item in enumerate(items):
+            if item.data is not None:
+                zf.writestr(_filename(i, item.spec), item.data)
+    return buf.getvalue()
+
+
+def build_multipart(items: list[BatchItem]) -> tuple[bytes, str]:
+    """multipart/mixed body (manifest part first) and its boundary."""
+    boundary = uuid.uuid4().hex
+    out = BytesIO()
+
+    def _part(headers: dict[str, str], body: bytes) -> None:
+        out.write(f"--{boundary}\r\n".encode())
+        for k, v in headers.items():
+            out.write(f"{k}: {v}\r\n".encode())
+        out.write(b"\r\n")
+        out.write(body)
+        out.write(b"\r\n")
+
+    _part({"Content-Type": "application/json"}, json.dumps(_manifest(items)).encode())
+    for i, item in enumerate(items):
+        if item.data is None:
+            continue
+        _part(
+            {
+                "Content-Type": item.spec.media_type,
+                "Content-Disposition": f'attachment; filename="{_filename(i, item.spec)}"',
+                "Content-Length": str(len(item.data)),
+            },
+            item.data,
+        )
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), boundary
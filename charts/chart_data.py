@@ -0,0 +1,85 @@
+# charts/chart_data.py
+#
+# Data-only counterparts of the chart images: the same values, labels,
+# axis limits and colours the renderers use, for drawing in the browser.
+
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from helpers.country_groups import CountryGroup, overlay_label
+from charts.chart_style import COUNTRY_COLOR, EU_COLOR
+from charts.contribution_bar_chart import compute_region_factors, bar_xlim, build_contribution_bar_title
+from charts.time_line_graph import (
+    OVERLAY_COLORS,
+    MAX_TIMELINE_COUNTRIES,
+    compute_series_many,
+    build_timeline_title,
+    timeline_ylim,
+)
+
+
+def _floats(values) -> list[float | None]:
+    """JSON-safe floats: NaN/inf become null."""
+    return [float(v) if math.isfinite(v) else None for v in np.asarray(values, dtype=float)]
+
+
+def contribution_bar_data(
+    df: pd.DataFrame,
+    geo_area: str,
+    year: int | str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    overlay: CountryGroup | None = None,
+) -> dict[str, Any]:
+    labels, country_vals, eu_vals = compute_region_factors(df, geo_area, year, overlay)
+    country_vals = np.asarray(country_vals, dtype=float)
+    xmin, xmax = bar_xlim(country_vals, fixed_scale)
+
+    series = [{"name": geo_area, "values": _floats(country_vals), "color": COUNTRY_COLOR}]
+    if show_eu:
+        series.append({"name": overlay_label(overlay), "values": _floats(eu_vals), "color": EU_COLOR})
+
+    return {
+        "title": build_contribution_bar_title(geo_area, year, show_eu, overlay),
+        "labels": labels,
+        "series": series,
+        "xlim": [xmin, xmax],
+        "zero_line": xmin < 0,
+        "x_label": "Contribution to happiness score",
+        "y_label": "Contributing factors",
+    }
+
+
+def timeline_data(
+    df: pd.DataFrame,
+    geo_area: str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    compare=(),
+    overlay: CountryGroup | None = None,
+) -> dict[str, Any]:
+    geo_areas = [geo_area, *compare]
+    if len(geo_areas) > MAX_TIMELINE_COUNTRIES:
+        raise ValueError(f"At most {MAX_TIMELINE_COUNTRIES} countries per timeline")
+
+    years, c_mat, eu_vals = compute_series_many(df, geo_areas, overlay)
+    ymin, ymax = timeline_ylim(c_mat.ravel(), eu_vals, fixed_scale)
+
+    series = [
+        {"name": name, "values": _floats(vals), "color": OVERLAY_COLORS[i], "dashed": False}
+        for i, (name, vals) in enumerate(zip(geo_areas, c_mat))
+    ]
+    if show_eu:
+        series.append({"name": overlay_label(overlay), "values": _floats(eu_vals), "color": EU_COLOR, "dashed": True})
+
+    return {
+        "title": build_timeline_title(geo_area, show_eu, fixed_scale, compare, overlay),
+        "years": years,
+        "series": series,
+        "ylim": [float(ymin), float(ymax)],
+        "x_label": "Year",
+        "y_label": "Happiness (ladder) score",
+    }
@@ -17,6 +17,16 @@ X_LABEL_PADDING = 12 * FONT_SCALE
 BASE_WIDTH = 12
 BASE_HEIGHT_BAR = 8
 BASE_HEIGHT_GRAPH = 6
+BASE_WIDTH_MULTI = 18  # small multiples: one panel per year
+BASE_DPI = 100  # matplotlib default: BASE_WIDTH x 100 = 1200px wide
+# -----------------------------
+
+# -----------------------------
+# Responsive image sizes
+# - requested width/height/dpi snap up to one of these dpis
+# - 25 -> 300px wide thumbnail ... 200 -> 2400px full-screen/retina
+# -----------------------------
+DPI_BUCKETS = (25, 50, 75, 100, 150, 200)
 # -----------------------------
 
 # -----------------------------
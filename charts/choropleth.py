@@ -0,0 +1,254 @@
+# charts/choropleth.py
+#
+# Server-side choropleth of the EU for emails, exports and low-power clients.
+# The geometry in eu.geojson (scripts/make_eu_geojson.py) is projected and
+# rasterized once into a palette image whose pixel values are country
+# indices; a request only rewrites the palette, then encodes.
+
+import json
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from matplotlib import colormaps
+from PIL import Image, ImageDraw
+
+from helpers.cache_helpers import LRUCache, SingleFlight
+from charts.map_data import FACTORS, YEARS
+from charts.pil_charts import PIL_FORMATS, PNG_COMPRESS_TYPE, load_font
+
+SCORE = "score"
+METRICS = (SCORE, *FACTORS)
+ABSOLUTE = "absolute"
+DELTA = "delta"
+MODES = (ABSOLUTE, DELTA)
+
+MAP_WIDTH = 800
+LEGEND_HEIGHT = 70
+TITLE_HEIGHT = 40
+
+# Lambert azimuthal equal-area centred on Europe (as EPSG:3035)
+PROJ_LON0, PROJ_LAT0 = 10.0, 52.0
+
+# Polygon parts outside this lon/lat box (Canaries, overseas regions) are
+# dropped so they don't shrink the mainland to fit
+EXTENT = (-25.0, 34.0, 45.0, 72.0)
+
+# Palette layout: 0 background, 1 border, 2 text, 3 no data,
+# countries from COUNTRY_BASE, colour ramp for the legend in the top block
+BACKGROUND, BORDER, TEXT, NO_DATA = 0, 1, 2, 3
+COUNTRY_BASE = 8
+RAMP_BASE, RAMP_STEPS = 128, 128
+NO_DATA_COLOR = (220, 220, 220)
+BORDER_COLOR = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+
+CMAPS = {ABSOLUTE: "viridis", DELTA: "RdBu"}
+
+METRIC_LABELS = {
+    SCORE: "Happiness (ladder) score",
+    "GDP": "GDP",
+    "social_support": "Social support",
+    "life_expectancy": "Life expectancy",
+    "freedom": "Freedom",
+    "generosity": "Generosity",
+    "corruption": "Corruption",
+    "other": "Residual (other)",
+}
+
+
+def _project(lon: np.ndarray, lat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    lam, phi = np.radians(lon - PROJ_LON0), np.radians(lat)
+    phi0 = np.radians(PROJ_LAT0)
+    k = np.sqrt(2 / (1 + np.sin(phi0) * np.sin(phi) + np.cos(phi0) * np.cos(phi) * np.cos(lam)))
+    x = k * np.cos(phi) * np.sin(lam)
+    y = k * (np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(lam))
+    return x, y
+
+
+def _polygons(geometry: dict[str, Any]) -> list[list[list[float]]]:
+    """Polygon ring lists from a Polygon or MultiPolygon geometry."""
+    if not geometry:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return list(geometry["coordinates"])
+    return []
+
+
+def _in_extent(ring) -> bool:
+    lon, lat = np.asarray(ring, dtype=float)[:, :2].mean(axis=0)
+    return EXTENT[0] <= lon <= EXTENT[2] and EXTENT[1] <= lat <= EXTENT[3]
+
+
+class ChoroplethBase:
+    """
+    The rasterized map: a palette image of country indices, the legend ramp
+    and frame, built once from the geojson. Coloring is a palette swap.
+    """
+
+    def __init__(self, geojson_path: Path, width: int = MAP_WIDTH):
+        features = json.loads(Path(geojson_path).read_text(encoding="utf-8")).get("features", [])
+
+        # iso2 -> list of exterior/hole rings in lon/lat
+        shapes: dict[str, list] = {}
+        for f in features:
+            iso2 = (f.get("properties") or {}).get("ISO_A2")
+            if not iso2:
+                continue
+            for poly in _polygons(f.get("geometry")):
+                if poly and _in_extent(poly[0]):
+                    shapes.setdefault(iso2, []).append(poly)
+        if not shapes:
+            raise ValueError(f"No usable country polygons in {geojson_path}")
+
+        self.iso2 = sorted(shapes)
+        if COUNTRY_BASE + len(self.iso2) > RAMP_BASE:
+            raise ValueError("Too many map features for the palette")
+        self.index = {iso2: COUNTRY_BASE + i for i, iso2 in enumerate(self.iso2)}
+
+        projected = {
+            iso2: [[np.column_stack(_project(*np.asarray(r, dtype=float)[:, :2].T)) for r in poly] for poly in polys]
+            for iso2, polys in shapes.items()
+        }
+        pts = np.vstack([r for polys in projected.values() for poly in polys for r in poly])
+        (xmin, ymin), (xmax, ymax) = pts.min(axis=0), pts.max(axis=0)
+
+        pad = 10
+        scale = (width - 2 * pad) / (xmax - xmin)
+        map_h = int(np.ceil((ymax - ymin) * scale)) + 2 * pad
+        self.width = width
+        self.height = TITLE_HEIGHT + map_h + LEGEND_HEIGHT
+
+        def to_px(ring: np.ndarray) -> list[tuple[float, float]]:
+            x = pad + (ring[:, 0] - xmin) * scale
+            y = TITLE_HEIGHT + pad + (ymax - ring[:, 1]) * scale
+            return list(zip(x.tolist(), y.tolist()))
+
+        img = Image.new("P", (self.width, self.height), BACKGROUND)
+        draw = ImageDraw.Draw(img)
+        for iso2, polys in projected.items():
+            for exterior, *holes in polys:
+                draw.polygon(to_px(exterior), fill=self.index[iso2])
+                for hole in holes:
+                    draw.polygon(to_px(hole), fill=BACKGROUND)
+        for polys in projected.values():
+            for poly in polys:
+                for ring in poly:
+                    draw.line(to_px(ring), fill=BORDER, width=1)
+
+        # Legend: a horizontal ramp of RAMP_STEPS palette slots, framed
+        self.ramp_box = (width // 4, self.height - LEGEND_HEIGHT + 12, 3 * width // 4, self.height - LEGEND_HEIGHT + 30)
+        x0, y0, x1, y1 = self.ramp_box
+        for i in range(RAMP_STEPS):
+            xa = x0 + (x1 - x0) * i / RAMP_STEPS
+            xb = x0 + (x1 - x0) * (i + 1) / RAMP_STEPS
+            draw.rectangle([xa, y0, xb, y1], fill=RAMP_BASE + i)
+        draw.rectangle(self.ramp_box, outline=TEXT)
+
+        self.image = img
+
+    def render(self, values: dict[str, float | None], vmin: float, vmax: float, cmap: str, title: str, fmt: str = "png") -> bytes:
+        if fmt not in PIL_FORMATS:
+            raise ValueError(f"Map images are available as {list(PIL_FORMATS)}, not '{fmt}'")
+
+        colormap = colormaps[cmap]
+        span = (vmax - vmin) or 1.0
+
+        palette = np.zeros((256, 3), dtype=np.uint8)
+        palette[BORDER] = BORDER_COLOR
+        palette[TEXT] = TEXT_COLOR
+        palette[NO_DATA] = NO_DATA_COLOR
+        for iso2, idx in self.index.items():
+            v = values.get(iso2)
+            if v is None or not np.isfinite(v):
+                palette[idx] = NO_DATA_COLOR
+            else:
+                palette[idx] = np.asarray(colormap(float(np.clip((v - vmin) / span, 0, 1)))[:3]) * 255
+        palette[RAMP_BASE:RAMP_BASE + RAMP_STEPS] = colormap(np.linspace(0, 1, RAMP_STEPS))[:, :3] * 255
+
+        img = self.image.copy()
+        img.putpalette(palette.ravel().tolist())
+        img.info["transparency"] = BACKGROUND
+
+        # Text is the only per-request drawing
+        draw = ImageDraw.Draw(img)
+        draw.fontmode = "1"  # palette image: no antialiasing
+        title_font, tick_font = load_font(18), load_font(13)
+        draw.text((self.width / 2, TITLE_HEIGHT / 2), title, font=title_font, fill=TEXT, anchor="mm")
+        x0, _, x1, y1 = self.ramp_box
+        for x, v in ((x0, vmin), ((x0 + x1) / 2, (vmin + vmax) / 2), (x1, vmax)):
+            draw.text((x, y1 + 6), f"{v:.2f}".replace("-", "−"), font=tick_font, fill=TEXT, anchor="mt")
+
+        buf = BytesIO()
+        if fmt == "png":
+            img.save(buf, format="PNG", compress_type=PNG_COMPRESS_TYPE)
+        else:
+            img.convert("RGBA").save(buf, format="WEBP", lossless=True)
+        return buf.getvalue()
+
+
+def map_layer(payload: dict[str, Any], year: int, metric: str = SCORE, mode: str = ABSOLUTE):
+    """
+    Per-country values, colour limits, colormap and title for one map view,
+    from build_map_payload. Limits come from its global bounds so colours
+    are comparable across years.
+    """
+    if int(year) not in YEARS:
+        raise ValueError(f"Unknown year {year} (expected one of {YEARS})")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown map metric '{metric}' (expected one of {list(METRICS)})")
+    if mode not in MODES:
+        raise ValueError(f"Unknown map mode '{mode}' (expected one of {list(MODES)})")
+
+    ys = str(int(year))
+    bounds = payload["bounds"]
+    if metric == SCORE:
+        eu = payload["eu"]["scores"][ys]
+        raw = {c["iso2"]: c["scores"].get(ys) for c in payload["countries"] if c.get("iso2")}
+        b = bounds["score_delta_vs_eu"] if mode == DELTA else bounds["score"]
+    else:
+        eu = payload["eu"]["factors"][ys][metric]
+        raw = {c["iso2"]: c["factors"].get(ys, {}).get(metric) for c in payload["countries"] if c.get("iso2")}
+        b = bounds["factor_delta_vs_eu"][metric] if mode == DELTA else bounds["factors"][metric]
+
+    vmin, vmax = b["min"], b["max"]
+    if vmin is None or vmax is None:
+        raise ValueError(f"No data for {metric} in {ys}")
+
+    title = f"{METRIC_LABELS[metric]}, {ys}"
+    if mode == DELTA:
+        # Diverging scale centred on the EU average
+        values = {k: (v - eu if v is not None and eu is not None else None) for k, v in raw.items()}
+        lim = max(abs(vmin), abs(vmax))
+        vmin, vmax = -lim, lim
+        title += " (vs EU average)"
+    else:
+        values = raw
+
+    return values, float(vmin), float(vmax), CMAPS[mode], title
+
+
+class ChoroplethRenderer:
+    """Map images by (year, metric, mode, format), rendered once each."""
+
+    def __init__(self, payload: dict[str, Any], base: ChoroplethBase, cache_size: int = 128):
+        self.payload = payload
+        self.base = base
+        self.cache = LRUCache(cache_size)
+        self.flight = SingleFlight()
+
+    def get(self, year: int, metric: str = SCORE, mode: str = ABSOLUTE, fmt: str = "png") -> bytes:
+        key = (int(year), metric, mode, fmt)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        def _render():
+            data = self.base.render(*map_layer(self.payload, year, metric, mode), fmt=fmt)
+            self.cache.put(key, data)
+            return data
+
+        return self.flight.do(key, _render)
@@ -1,69 +1,97 @@
 from io import BytesIO
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
+from helpers.data_cube import as_cube
+from helpers.country_groups import CountryGroup, overlay_label, overlay_means
 from charts.chart_style import (
     AXIS_LABEL_SIZE,
     TICK_SIZE,
     X_LABEL_PADDING,
     BASE_WIDTH,
+    BASE_WIDTH_MULTI,
     BASE_HEIGHT_BAR,
     EU_BAR_XMIN, EU_BAR_XMAX, EU_BAR_XPAD_RATIO,
     FIXED_BAR_XMIN, FIXED_BAR_XMAX, FIXED_BAR_XPAD_RATIO,
     COUNTRY_COLOR, EU_COLOR,
 )
+from charts.figure_templates import (
+    TemplatePool,
+    ZERO_LINE_COLOR,
+    figure_bytes,
+    new_figure,
+    new_panel_figure,
+    style_axes,
+)
 
-
-def _compute_region_factors(df: pd.DataFrame, geo_area: str, year: int | str):
-    geo_area = str(geo_area).strip()
-
+YEARS = [2021, 2022, 2023]
+
+FACTOR_BASENAMES = [
+    "GDP",
+    "social_support",
+    "life_expectancy",
+    "freedom",
+    "generosity",
+    "corruption",
+    "other",
+]
+
+FACTOR_LABELS = [
+    "GDP",
+    "Social support",
+    "Life expectancy",
+    "Freedom",
+    "Generosity",
+    "Corruption",
+    "Residual (other)",
+]
+
+
+def compute_region_factors(df: pd.DataFrame, geo_area: str, year: int | str, overlay: CountryGroup | None = None):
+    """(factor labels, the country's factor values, the overlay (EU) means) for one year."""
     year_str = str(year)
     if len(year_str) == 4:
         year_str = year_str[-2:]
-    suffix = f"_{year_str}"
-
-    factor_basenames = [
-        "GDP",
-        "social_support",
-        "life_expectancy",
-        "freedom",
-        "generosity",
-        "corruption",
-        "other",
-    ]
-    factor_cols = [f"{name}{suffix}" for name in factor_basenames]
-
-    missing = [c for c in factor_cols if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing expected columns for year 20{year_str}: {missing}")
 
-    if "population_EU_only" not in df.columns:
+    if overlay is None and "population_EU_only" not in df.columns:
         raise ValueError("EU overlay requires 'population_EU_only' column")
 
-    eu_df = df[df["population_EU_only"].notna()]
-    eu_series = eu_df[factor_cols].mean()
+    cube = as_cube(df)
+    try:
+        y = cube.year_index(year_str)
+        m = cube.metric_indices(FACTOR_BASENAMES)
+    except ValueError:
+        missing = [f"{name}_{year_str}" for name in FACTOR_BASENAMES if f"{name}_{year_str}" not in df.columns]
+        raise ValueError(f"Missing expected columns for year 20{year_str}: {missing}")
 
-    country_df = df[df["country"].astype(str).str.strip() == geo_area]
-    if country_df.empty:
-        raise ValueError(f"No rows found for country '{geo_area}'")
+    c = cube.country_index(geo_area)
+    country_vals = cube.values[c, y, m]
+    eu_vals = overlay_means(df, overlay)[y, m]
 
-    country_series = country_df[factor_cols].mean()
+    return list(FACTOR_LABELS), country_vals, eu_vals
 
-    labels = [
-        "GDP",
-        "Social support",
-        "Life expectancy",
-        "Freedom",
-        "Generosity",
-        "Corruption",
-        "Residual (other)",
-    ]
 
-    return labels, country_series.values, eu_series.values
+def _compute_region_factors_all_years(df: pd.DataFrame, geo_area: str, years=YEARS, overlay: CountryGroup | None = None):
+    """
+    Factor vectors for every year as (n_years, n_factors) matrices:
+    one row of the cube for the country, and the overlay (EU) mean.
+    """
+    if overlay is None and "population_EU_only" not in df.columns:
+        raise ValueError("EU overlay requires 'population_EU_only' column")
 
+    years = [int(y) for y in years]
+    cube = as_cube(df)
+    y = np.array([cube.year_index(yr) for yr in years], dtype=int)
+    m = cube.metric_indices(FACTOR_BASENAMES)
+    c = cube.country_index(geo_area)
 
-def build_contribution_bar_title(geo_area: str, year: int | str, show_eu: bool = False) -> str:
+    country_mat = cube.values[c][np.ix_(y, m)]
+    eu_mat = overlay_means(df, overlay)[np.ix_(y, m)]
+
+    return list(FACTOR_LABELS), years, country_mat, eu_mat
+
+
+def build_contribution_bar_title(geo_area: str, year: int | str, show_eu: bool = False, overlay: CountryGroup | None = None) -> str:
     year_str = str(year)
     if len(year_str) == 4:
         year_str = year_str[-2:]
@@ -71,72 +99,214 @@ def build_contribution_bar_title(geo_area: str, year: int | str, show_eu: bool =
 
     title = f"Happiness contributory factor scores for\n{geo_area} in {year}"
     if show_eu:
-        title += " (alongside EU average)"
+        title += f" (alongside {overlay_label(overlay)})"
     return title
 
 
+def bar_xlim(country_vals, fixed_scale: bool = False) -> tuple[float, float]:
+    """
+    x-axis limits for the bar chart. The left edge only drops below zero
+    when the selected country has a negative contribution.
+    """
+    country_vals = np.asarray(country_vals, dtype=float)
+    finite_country = country_vals[np.isfinite(country_vals)]
+    country_has_negative = bool(finite_country.size and finite_country.min() < 0)
+
+    if fixed_scale:
+        xmax = FIXED_BAR_XMAX * (1 + FIXED_BAR_XPAD_RATIO)
+    else:
+        xmax = EU_BAR_XMAX * (1 + EU_BAR_XPAD_RATIO)
+    xmin = FIXED_BAR_XMIN if country_has_negative else 0
+
+    return xmin, xmax
+
+
+class _BarTemplate:
+    """
+    Pre-styled bar chart figure. Only bar widths, x limits, the zero line
+    and the legend label change between renders.
+    """
+
+    def __init__(self, show_eu: bool):
+        self.fig, self.ax = new_figure(BASE_WIDTH, BASE_HEIGHT_BAR)
+        ax = self.ax
+
+        y = np.arange(len(FACTOR_LABELS))
+        zeros = np.zeros(len(FACTOR_LABELS))
+
+        self.zero_line = ax.axvline(0, linewidth=1, color=ZERO_LINE_COLOR, alpha=0.8)
+        self.zero_line.set_visible(False)
+
+        if show_eu:
+            bar_h = 0.35
+            self.country_bars = ax.barh(y - bar_h / 2, zeros, height=bar_h, color=COUNTRY_COLOR, label=" ")
+            self.eu_bars = ax.barh(y + bar_h / 2, zeros, height=bar_h, color=EU_COLOR, label="EU average")
+            self.legend = ax.legend(frameon=False, fontsize=TICK_SIZE)
+        else:
+            self.country_bars = ax.barh(y, zeros, color=COUNTRY_COLOR)
+            self.eu_bars = None
+            self.legend = None
+
+        ax.set_yticks(y)
+        ax.set_yticklabels(FACTOR_LABELS)
+
+        ax.set_xlabel(
+            "Contribution to happiness score",
+            fontsize=AXIS_LABEL_SIZE,
+            labelpad=X_LABEL_PADDING,
+        )
+        ax.set_ylabel("Contributing factors", fontsize=AXIS_LABEL_SIZE)
+
+        style_axes(ax, grid_axis="x")
+        ax.invert_yaxis()
+
+        # Tick labels on both axes are fixed-width, so one layout pass fits every render
+        ax.set_xlim(*bar_xlim([FIXED_BAR_XMIN]))
+        self.fig.tight_layout()
+
+    def render(
+        self,
+        geo_area: str,
+        country_vals,
+        eu_vals,
+        xlim: tuple[float, float],
+        fmt: str = "png",
+        dpi: int | None = None,
+        eu_label: str = "EU average",
+    ) -> bytes:
+        for bar, v in zip(self.country_bars, country_vals):
+            bar.set_width(v)
+        if self.eu_bars is not None:
+            for bar, v in zip(self.eu_bars, eu_vals):
+                bar.set_width(v)
+            self.legend.get_texts()[0].set_text(geo_area)
+            self.legend.get_texts()[1].set_text(eu_label)
+
+        self.ax.set_xlim(*xlim)
+        self.zero_line.set_visible(xlim[0] < 0)
+
+        return figure_bytes(self.fig, fmt, dpi)
+
+
+_templates = TemplatePool(lambda show_eu: _BarTemplate(show_eu))
+
+
+class _SmallMultiplesTemplate:
+    """
+    One bar panel per year, side by side with shared axes; factor labels
+    only on the leftmost panel. Same update-in-place approach as _BarTemplate.
+    """
+
+    def __init__(self, show_eu: bool, years=tuple(YEARS)):
+        self.fig, self.axes = new_panel_figure(BASE_WIDTH_MULTI, BASE_HEIGHT_BAR, len(years))
+        self.years = list(years)
+
+        y = np.arange(len(FACTOR_LABELS))
+        zeros = np.zeros(len(FACTOR_LABELS))
+
+        self.country_bars = []
+        self.eu_bars = []
+        self.zero_lines = []
+        for ax, year in zip(self.axes, self.years):
+            zero_line = ax.axvline(0, linewidth=1, color=ZERO_LINE_COLOR, alpha=0.8)
+            zero_line.set_visible(False)
+            self.zero_lines.append(zero_line)
+
+            if show_eu:
+                bar_h = 0.35
+                self.country_bars.append(ax.barh(y - bar_h / 2, zeros, height=bar_h, color=COUNTRY_COLOR, label=" "))
+                self.eu_bars.append(ax.barh(y + bar_h / 2, zeros, height=bar_h, color=EU_COLOR, label="EU average"))
+            else:
+                self.country_bars.append(ax.barh(y, zeros, color=COUNTRY_COLOR))
+
+            ax.set_title(str(year), fontsize=AXIS_LABEL_SIZE)
+            style_axes(ax, grid_axis="x")
+
+        first = self.axes[0]
+        first.set_yticks(y)
+        first.set_yticklabels(FACTOR_LABELS)
+        first.set_ylabel("Contributing factors", fontsize=AXIS_LABEL_SIZE)
+        first.invert_yaxis()
+
+        self.fig.supxlabel("Contribution to happiness score", fontsize=AXIS_LABEL_SIZE)
+
+        self.legend = self.axes[-1].legend(frameon=False, fontsize=TICK_SIZE) if show_eu else None
+
+        first.set_xlim(*bar_xlim([FIXED_BAR_XMIN]))
+        self.fig.tight_layout()
+
+    def render(
+        self,
+        geo_area: str,
+        country_mat,
+        eu_mat,
+        xlim: tuple[float, float],
+        fmt: str = "png",
+        dpi: int | None = None,
+        eu_label: str = "EU average",
+    ) -> bytes:
+        for i in range(len(self.years)):
+            for bar, v in zip(self.country_bars[i], country_mat[i]):
+                bar.set_width(v)
+            if self.eu_bars:
+                for bar, v in zip(self.eu_bars[i], eu_mat[i]):
+                    bar.set_width(v)
+            self.zero_lines[i].set_visible(xlim[0] < 0)
+
+        if self.legend is not None:
+            self.legend.get_texts()[0].set_text(geo_area)
+            self.legend.get_texts()[1].set_text(eu_label)
+
+        # sharex: setting one panel's limits moves them all
+        self.axes[0].set_xlim(*xlim)
+
+        return figure_bytes(self.fig, fmt, dpi)
+
+
+_multiples_templates = TemplatePool(lambda show_eu: _SmallMultiplesTemplate(show_eu))
+
+
 def plot_contribution_bar_chart(
     df: pd.DataFrame,
     geo_area: str,
     year: int | str,
     show_eu: bool = False,
     fixed_scale: bool = False,
+    fmt: str = "png",
+    dpi: int | None = None,
+    overlay: CountryGroup | None = None,
 ) -> BytesIO:
 
-    labels, country_vals, eu_vals = _compute_region_factors(df, geo_area, year)
+    labels, country_vals, eu_vals = compute_region_factors(df, geo_area, year, overlay)
 
     country_vals = np.asarray(country_vals, dtype=float)
     eu_vals = np.asarray(eu_vals, dtype=float)
 
-    fig, ax = plt.subplots(figsize=(BASE_WIDTH, BASE_HEIGHT_BAR))
+    xlim = bar_xlim(country_vals, fixed_scale)
 
-    finite_country = country_vals[np.isfinite(country_vals)]
-    country_has_negative = bool(finite_country.size and finite_country.min() < 0)
+    with _templates.checkout(bool(show_eu)) as template:
+        data = template.render(geo_area, country_vals, eu_vals, xlim, fmt, dpi, overlay_label(overlay))
+
+    return BytesIO(data)
 
-    if fixed_scale:
-        xmax = FIXED_BAR_XMAX * (1 + FIXED_BAR_XPAD_RATIO)
-        xmin = FIXED_BAR_XMIN if country_has_negative else 0
-    else:
-        xmax = EU_BAR_XMAX * (1 + EU_BAR_XPAD_RATIO)
-        xmin = FIXED_BAR_XMIN if country_has_negative else 0
 
-    ax.set_xlim(xmin, xmax)
+def plot_contribution_small_multiples(
+    df: pd.DataFrame,
+    geo_area: str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    fmt: str = "png",
+    dpi: int | None = None,
+    overlay: CountryGroup | None = None,
+) -> BytesIO:
+    """Every year's contribution bars in one figure, on a shared x scale."""
 
-    if xmin < 0:
-        ax.axvline(0, linewidth=1, color="#666666", alpha=0.8)
+    labels, years, country_mat, eu_mat = _compute_region_factors_all_years(df, geo_area, overlay=overlay)
 
-    if show_eu:
-        y = np.arange(len(labels))
-        bar_h = 0.35
+    # One scale for all panels, so a negative in any year extends them all
+    xlim = bar_xlim(country_mat.ravel(), fixed_scale)
 
-        ax.barh(y - bar_h / 2, country_vals, height=bar_h, color=COUNTRY_COLOR, label=geo_area)
-        ax.barh(y + bar_h / 2, eu_vals, height=bar_h, color=EU_COLOR, label="EU average")
+    with _multiples_templates.checkout(bool(show_eu)) as template:
+        data = template.render(geo_area, country_mat, eu_mat, xlim, fmt, dpi, overlay_label(overlay))
 
-        ax.set_yticks(y)
-        ax.set_yticklabels(labels)
-        ax.legend(frameon=False, fontsize=TICK_SIZE)
-    else:
-        ax.barh(labels, country_vals, color=COUNTRY_COLOR)
-
-    ax.set_xlabel(
-        "Contribution to happiness score",
-        fontsize=AXIS_LABEL_SIZE,
-        labelpad=X_LABEL_PADDING,
-    )
-    ax.set_ylabel("Contributing factors", fontsize=AXIS_LABEL_SIZE)
-
-    ax.tick_params(axis="x", labelsize=TICK_SIZE)
-    ax.tick_params(axis="y", labelsize=TICK_SIZE)
-
-    ax.invert_yaxis()
-    ax.grid(axis="x", linestyle="-", linewidth=1, color="#cccccc")
-
-    for spine in ax.spines.values():
-        spine.set_color("#cccccc")
-
-    fig.tight_layout()
-    buf = BytesIO()
-    fig.savefig(buf, format="png", transparent=True)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    return BytesIO(data)
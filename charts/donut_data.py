@@ -2,6 +2,8 @@ from typing import Any, Dict, List
 import numpy as np
 import pandas as pd
 
+from helpers.data_cube import as_cube
+
 
 def compute_factor_donut(
     df: pd.DataFrame,
@@ -40,59 +42,29 @@ def compute_factor_donut(
         year_str = year_str[-2:]
 
     # ✅ Special-case: combined score is the overall ladder score column
-    if factor == "combined_score":
-        value_col = f"ladder_score_{year_str}"
-    else:
-        value_col = f"{factor}_{year_str}"
+    metric = "ladder_score" if factor == "combined_score" else factor
+    value_col = f"{metric}_{year_str}"
 
     if value_col not in df.columns:
         raise ValueError(f"Missing column '{value_col}'")
 
-    if "country" not in df.columns:
-        raise ValueError("Expected a 'country' column")
+    # --- Per-country means from the cube; EU members have population_EU_only ---
+    cube = as_cube(df)
+    values = cube.values[:, cube.year_index(year_str), cube.metric_index(metric)]
 
-    # --- Identify EU member countries (based on your existing approach) ---
-    if "population_EU_only" in df.columns:
-        eu_agg_df = df[df["population_EU_only"].notna()].copy()
-        if eu_agg_df.empty:
+    # Without the EU column every country counts as EU (as before)
+    if eu_only and "population_EU_only" in df.columns:
+        if not cube.eu_mask.any():
             raise ValueError("No EU aggregate rows found (population_EU_only is empty)")
-
-        eu_countries = (
-            eu_agg_df["country"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .unique()
-            .tolist()
-        )
+        keep = cube.eu_mask
     else:
-        eu_countries = (
-            df["country"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .unique()
-            .tolist()
-        )
-
-    eu_countries = [c for c in eu_countries if c]
-
-    # --- Country rows only, normalised ---
-    country_rows = df[df["country"].notna()].copy()
-    country_rows["country"] = country_rows["country"].astype(str).str.strip()
-    country_rows = country_rows[country_rows["country"] != ""]
-
-    if eu_only:
-        country_rows = country_rows[country_rows["country"].isin(eu_countries)]
-
-    if country_rows.empty:
-        return {"factor": factor, "year": int(year), "total": 0.0, "rows": []}
+        keep = np.ones(len(cube.countries), dtype=bool)
 
-    # --- Compute mean per country for the requested column ---
-    country_means = country_rows.groupby("country")[value_col].mean()
+    # Alphabetical like the groupby this replaced, so ties keep their order
+    alpha = cube.alpha_order[keep[cube.alpha_order]]
+    country_means = pd.Series(values[alpha], index=np.array(cube.countries, dtype=object)[alpha])
 
-    # Ensure numeric & finite
-    country_means = pd.to_numeric(country_means, errors="coerce")
+    # Ensure finite
     country_means = country_means[np.isfinite(country_means.values)]
 
     if country_means.empty:
@@ -1,32 +0,0 @@
-# charts/eu_iso2.py
-
-EU_NAME_TO_ISO2 = {
-    "Austria": "AT",
-    "Belgium": "BE",
-    "Bulgaria": "BG",
-    "Croatia": "HR",
-    "Cyprus": "CY",
-    "Czech Republic": "CZ",
-    "Czechia": "CZ",
-    "Denmark": "DK",
-    "Estonia": "EE",
-    "Finland": "FI",
-    "France": "FR",
-    "Germany": "DE",
-    "Greece": "GR",
-    "Hungary": "HU",
-    "Ireland": "IE",
-    "Italy": "IT",
-    "Latvia": "LV",
-    "Lithuania": "LT",
-    "Luxembourg": "LU",
-    "Malta": "MT",
-    "Netherlands": "NL",
-    "Poland": "PL",
-    "Portugal": "PT",
-    "Romania": "RO",
-    "Slovakia": "SK",
-    "Slovenia": "SI",
-    "Spain": "ES",
-    "Sweden": "SE",
-}
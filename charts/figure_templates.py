@@ -0,0 +1,88 @@
+# charts/figure_templates.py
+#
+# pyplot-free figure plumbing shared by the chart modules.
+# Figures are built with matplotlib.figure.Figure + the Agg canvas directly,
+# so nothing touches pyplot's global figure manager and renders can run in
+# parallel threads. Each chart keeps pre-styled template figures and only
+# updates its data artists between renders.
+
+from collections import defaultdict
+from contextlib import contextmanager
+from io import BytesIO
+from threading import Lock
+from typing import Callable, Hashable, Iterator
+
+import matplotlib
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from charts.chart_style import TICK_SIZE
+
+GRID_COLOR = "#cccccc"
+ZERO_LINE_COLOR = "#666666"
+
+# Keep SVG text as <text> rather than outlined paths: less than half the bytes
+matplotlib.rcParams["svg.fonttype"] = "none"
+
+# Per-format savefig options
+SAVE_OPTIONS = {
+    "png": {},
+    "svg": {"metadata": {"Date": None}},  # no timestamp, so output is reproducible
+    "webp": {"pil_kwargs": {"lossless": True}},
+}
+
+
+def new_figure(width: float, height: float) -> tuple[Figure, Axes]:
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    return fig, ax
+
+
+def new_panel_figure(width: float, height: float, ncols: int) -> tuple[Figure, list[Axes]]:
+    """One row of ncols panels sharing both axes."""
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(1, ncols, sharex=True, sharey=True, squeeze=False)[0]
+    return fig, list(axes)
+
+
+def style_axes(ax: Axes, grid_axis: str) -> None:
+    """House style shared by every chart: tick sizes, light grid, grey spines."""
+    ax.tick_params(axis="both", labelsize=TICK_SIZE)
+    ax.grid(axis=grid_axis, linestyle="-", linewidth=1, color=GRID_COLOR)
+    for spine in ax.spines.values():
+        spine.set_color(GRID_COLOR)
+
+
+def figure_bytes(fig: Figure, fmt: str = "png", dpi: int | None = None) -> bytes:
+    """Serialize fig; dpi rescales the whole figure, text included."""
+    buf = BytesIO()
+    fig.savefig(buf, format=fmt, transparent=True, dpi=dpi or "figure", **SAVE_OPTIONS[fmt])
+    return buf.getvalue()
+
+
+class TemplatePool:
+    """
+    Idle template figures per key. A render checks one out, mutates it and
+    returns it, so two threads never share a figure; new templates are only
+    built when every existing one for that key is busy.
+    """
+
+    def __init__(self, factory: Callable[[Hashable], object]):
+        self._factory = factory
+        self._idle: dict[Hashable, list] = defaultdict(list)
+        self._lock = Lock()
+
+    @contextmanager
+    def checkout(self, key: Hashable) -> Iterator:
+        with self._lock:
+            template = self._idle[key].pop() if self._idle[key] else None
+        if template is None:
+            template = self._factory(key)
+        try:
+            yield template
+        finally:
+            with self._lock:
+                self._idle[key].append(template)
@@ -5,7 +5,7 @@ from typing import Any, Dict, List, Tuple
 import numpy as np
 import pandas as pd
 
-from charts.eu_iso2 import EU_NAME_TO_ISO2
+from helpers.data_cube import EU, as_cube
 
 YEARS: List[int] = [2021, 2022, 2023]
 
@@ -50,20 +50,12 @@ def _get_eu_country_names(df: pd.DataFrame) -> List[str]:
     if "country" not in df.columns:
         raise ValueError("Expected a 'country' column")
 
-    eu_agg_df = df[df["population_EU_only"].notna()]
-    if eu_agg_df.empty:
+    cube = as_cube(df)
+    if not cube.eu_mask.any():
         raise ValueError("No EU rows found (population_EU_only is empty)")
 
-    eu_countries = (
-        eu_agg_df["country"]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .unique()
-        .tolist()
-    )
-    eu_countries = [c for c in eu_countries if c]  # drop blanks
-    return sorted(eu_countries)
+    # alpha_order is the cube's precomputed alphabetical order
+    return [cube.countries[i] for i in cube.alpha_order if cube.eu_mask[i]]
 
 
 def _safe_float(x: Any) -> float | None:
@@ -75,19 +67,19 @@ def _safe_float(x: Any) -> float | None:
 
 
 def _compute_eu_averages(df: pd.DataFrame) -> Dict[str, Any]:
-    eu_df = df[df["population_EU_only"].notna()]
+    # EU means come from the shared aggregate store
+    agg = as_cube(df).aggregates
     eu: Dict[str, Any] = {"scores": {}, "factors": {}}
 
     # Ladder EU averages
     for y in YEARS:
-        col = LADDER_COLS[y]
-        eu["scores"][str(y)] = _safe_float(eu_df[col].mean())
+        eu["scores"][str(y)] = agg.value(EU, y, "ladder_score")
 
     # Factor EU averages
     for y in YEARS:
         eu["factors"][str(y)] = {}
-        for f, col in FACTOR_COLS[y].items():
-            eu["factors"][str(y)][f] = _safe_float(eu_df[col].mean())
+        for f in FACTOR_COLS[y]:
+            eu["factors"][str(y)][f] = agg.value(EU, y, f)
 
     return eu
 
@@ -97,20 +89,24 @@ def _compute_country_means(df: pd.DataFrame, eu_countries: List[str]) -> pd.Data
     Returns a df where each row is one country and columns include
     ladder_score_21/22/23 and factor cols.
     """
-    country_df = df[df["country"].notna()].copy()
-    country_df["country"] = country_df["country"].astype(str).str.strip()
-    country_df = country_df[country_df["country"].isin(eu_countries)]
-
-    if country_df.empty:
+    if not eu_countries:
         raise ValueError("No EU member country rows found (after filtering)")
 
     needed_cols = ["country"] + list(LADDER_COLS.values())
     for y in YEARS:
         needed_cols.extend(list(FACTOR_COLS[y].values()))
-    _require_cols(country_df, needed_cols)
+    _require_cols(df, needed_cols)
 
-    # mean per country (same semantics as your other charts)
-    return country_df.groupby("country", as_index=False)[needed_cols[1:]].mean()
+    # mean per country (same semantics as your other charts): rows of the cube
+    cube = as_cube(df)
+    idx = cube.country_indices(eu_countries)
+    means = pd.DataFrame({"country": eu_countries})
+    for y in YEARS:
+        yi = cube.year_index(y)
+        means[LADDER_COLS[y]] = cube.values[idx, yi, cube.metric_index("ladder_score")]
+        for f, col in FACTOR_COLS[y].items():
+            means[col] = cube.values[idx, yi, cube.metric_index(f)]
+    return means
 
 
 def _compute_bounds(payload_countries: List[Dict[str, Any]], eu: Dict[str, Any]) -> Dict[str, Any]:
@@ -190,10 +186,11 @@ def build_map_payload(df: pd.DataFrame) -> Dict[str, Any]:
 
     means_df = _compute_country_means(df, eu_countries)
 
+    resolver = as_cube(df).resolver
     countries: List[Dict[str, Any]] = []
     for _, row in means_df.iterrows():
         name = str(row["country"]).strip()
-        iso2 = EU_NAME_TO_ISO2.get(name)
+        iso2 = resolver.iso2(name)
 
         # If we can't map it, we still include it, but iso2 will be None
         country_obj: Dict[str, Any] = {
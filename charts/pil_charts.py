@@ -0,0 +1,366 @@
+# charts/pil_charts.py
+#
+# Lightweight Pillow renderer for the two simple image charts.
+# Same data, limits, colours and figure size as the matplotlib versions,
+# but drawn straight onto an RGBA image: no figure tree, no layout engine.
+
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+import zlib
+
+import numpy as np
+import pandas as pd
+from matplotlib import get_data_path
+from matplotlib.ticker import MaxNLocator
+from PIL import Image, ImageDraw, ImageFont
+
+from helpers.country_groups import CountryGroup, overlay_label
+from charts.chart_style import (
+    AXIS_LABEL_SIZE,
+    TICK_SIZE,
+    X_LABEL_PADDING,
+    BASE_WIDTH,
+    BASE_HEIGHT_BAR,
+    BASE_HEIGHT_GRAPH,
+    BASE_DPI,
+    COUNTRY_COLOR,
+    EU_COLOR,
+)
+from charts.contribution_bar_chart import compute_region_factors, bar_xlim
+from charts.time_line_graph import _compute_series, timeline_ylim
+from charts.figure_templates import GRID_COLOR, ZERO_LINE_COLOR
+
+# Same dpi as the matplotlib figures, so pixel sizes match the Agg output
+DPI = BASE_DPI
+TEXT_COLOR = "#000000"
+
+# Deflate dominates the cost of these flat-colour images; run-length matching
+# is as fast as level 1 and about as small as the default strategy
+PNG_COMPRESS_TYPE = zlib.Z_RLE
+
+FONT_PATH = Path(get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf"
+
+
+def _px(points: float, dpi: int = DPI) -> int:
+    return max(1, int(round(points * dpi / 72)))
+
+
+@lru_cache(maxsize=None)
+def load_font(size_px: int) -> ImageFont.FreeTypeFont:
+    """The chart font at size_px (cached); Pillow's default if DejaVu Sans is missing."""
+    if FONT_PATH.exists():
+        return ImageFont.truetype(str(FONT_PATH), size_px)
+    return ImageFont.load_default(size=size_px)
+
+
+def _text_size(font: ImageFont.FreeTypeFont, text: str) -> tuple[int, int]:
+    left, top, right, bottom = font.getbbox(text)
+    return right - left, bottom - top
+
+
+def _ticks(vmin: float, vmax: float) -> list[float]:
+    ticks = MaxNLocator(nbins="auto", steps=[1, 2, 2.5, 5, 10]).tick_values(vmin, vmax)
+    eps = (vmax - vmin) * 1e-9
+    return [float(t) for t in ticks if vmin - eps <= t <= vmax + eps]
+
+
+def _tick_labels(ticks: list[float]) -> list[str]:
+    # Fewest decimals that still tell every tick apart (like ScalarFormatter)
+    for decimals in range(4):
+        labels = [f"{t:.{decimals}f}" for t in ticks]
+        if all(abs(float(lbl) - t) < 1e-9 for lbl, t in zip(labels, ticks)):
+            break
+    return [lbl.replace("-", "−") if lbl.startswith("-") else lbl for lbl in labels]
+
+
+def _draw_rotated_text(img: Image.Image, text: str, font, center: tuple[int, int]) -> None:
+    w, h = _text_size(font, text)
+    layer = Image.new("RGBA", (w + 4, h + 8), (0, 0, 0, 0))
+    ImageDraw.Draw(layer).text((2, 2), text, font=font, fill=TEXT_COLOR, anchor="lt")
+    layer = layer.rotate(90, expand=True)
+    img.alpha_composite(layer, (center[0] - layer.width // 2, center[1] - layer.height // 2))
+
+
+def _legend_size(entries: list[tuple[str, str, str]], dpi: int = DPI) -> tuple[int, int]:
+    font = load_font(_px(TICK_SIZE, dpi))
+    label_w = max(_text_size(font, label)[0] for label, _, _ in entries)
+    width = int(font.size * 1.6) + int(font.size * 0.4) + label_w
+    return width, int(font.size * 1.4) * len(entries)
+
+
+def _draw_legend(
+    draw: ImageDraw.ImageDraw,
+    entries: list[tuple[str, str, str]],
+    x0: float,
+    top: float,
+    dpi: int = DPI,
+) -> None:
+    """entries are (label, colour, kind) with kind 'bar', 'line' or 'dashed'."""
+    font = load_font(_px(TICK_SIZE, dpi))
+    line_h = int(font.size * 1.4)
+    handle_w = int(font.size * 1.6)
+    x0, top = int(x0), int(top)
+
+    for i, (label, color, kind) in enumerate(entries):
+        cy = top + i * line_h + line_h // 2
+        if kind == "bar":
+            draw.rectangle([x0, cy - font.size // 3, x0 + handle_w, cy + font.size // 3], fill=color)
+        else:
+            if kind == "dashed":
+                seg = handle_w // 5
+                for sx in range(x0, x0 + handle_w, seg * 2):
+                    draw.line([(sx, cy), (min(sx + seg, x0 + handle_w), cy)], fill=color, width=_px(2, dpi))
+            else:
+                draw.line([(x0, cy), (x0 + handle_w, cy)], fill=color, width=_px(2, dpi))
+            r = _px(3, dpi)
+            mx = x0 + handle_w // 2
+            draw.ellipse([mx - r, cy - r, mx + r, cy + r], fill=color)
+        draw.text((x0 + handle_w + int(font.size * 0.4), cy), label, font=font, fill=TEXT_COLOR, anchor="lm")
+
+
+def _best_legend_corner(
+    size: tuple[int, int],
+    plot_box: tuple[float, float, float, float],
+    points: list[tuple[float, float]],
+    dpi: int = DPI,
+) -> tuple[float, float]:
+    """
+    Top-left of the legend in whichever plot corner covers the fewest data
+    points (a cheap stand-in for matplotlib's loc="best").
+    """
+    left, top, right, bottom = plot_box
+    w, h = size
+    margin = _px(6, dpi)
+    corners = [
+        (right - margin - w, top + margin),
+        (right - margin - w, bottom - margin - h),
+        (left + margin, top + margin),
+        (left + margin, bottom - margin - h),
+    ]
+
+    def _covered(corner):
+        x0, y0 = corner
+        return sum(1 for x, y in points if x0 <= x <= x0 + w and y0 <= y <= y0 + h)
+
+    return min(corners, key=_covered)
+
+
+def _segment_samples(pts: list[tuple[float, float]], n: int = 40) -> list[tuple[float, float]]:
+    out = list(pts)
+    for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+        out.extend((xa + (xb - xa) * k / n, ya + (yb - ya) * k / n) for k in range(1, n))
+    return out
+
+
+# Raster formats this engine can write (no SVG: use the matplotlib engine)
+PIL_FORMATS = ("png", "webp")
+
+
+def image_bytes(img: Image.Image, fmt: str = "png") -> bytes:
+    """img encoded as fmt (one of PIL_FORMATS)."""
+    buf = BytesIO()
+    if fmt == "png":
+        img.save(buf, format="PNG", compress_type=PNG_COMPRESS_TYPE)
+    elif fmt == "webp":
+        img.save(buf, format="WEBP", lossless=True)
+    else:
+        raise ValueError(f"Pillow engine cannot write '{fmt}' (supports {list(PIL_FORMATS)})")
+    return buf.getvalue()
+
+
+def render_contribution_bar_png(
+    labels: list[str],
+    country_vals,
+    eu_vals,
+    xlim: tuple[float, float],
+    geo_area: str,
+    show_eu: bool = False,
+    fmt: str = "png",
+    dpi: int = DPI,
+    eu_label: str = "EU average",
+) -> bytes:
+    width, height = BASE_WIDTH * dpi, BASE_HEIGHT_BAR * dpi
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    tick_font = load_font(_px(TICK_SIZE, dpi))
+    label_font = load_font(_px(AXIS_LABEL_SIZE, dpi))
+    tick_len = _px(3.5, dpi)
+    pad = _px(3.5, dpi)
+
+    # --- layout: reserve room for tick labels and axis labels ---
+    ylabel_w = max(_text_size(tick_font, lbl)[0] for lbl in labels)
+    left = _px(6, dpi) + label_font.size + _px(6, dpi) + ylabel_w + pad + tick_len
+    right = width - _px(12, dpi)
+    top = _px(12, dpi)
+    bottom = height - (_px(6, dpi) + label_font.size + _px(X_LABEL_PADDING, dpi) + tick_font.size + pad + tick_len)
+
+    xmin, xmax = xlim
+
+    def x_px(v: float) -> float:
+        return left + (v - xmin) / (xmax - xmin) * (right - left)
+
+    # --- grid + x ticks ---
+    xticks = _ticks(xmin, xmax)
+    for t, lbl in zip(xticks, _tick_labels(xticks)):
+        x = x_px(t)
+        draw.line([(x, top), (x, bottom)], fill=GRID_COLOR, width=_px(1, dpi))
+        draw.line([(x, bottom), (x, bottom + tick_len)], fill=TEXT_COLOR, width=_px(1, dpi))
+        draw.text((x, bottom + tick_len + pad), lbl, font=tick_font, fill=TEXT_COLOR, anchor="mt")
+
+    if xmin < 0:
+        draw.line([(x_px(0), top), (x_px(0), bottom)], fill=ZERO_LINE_COLOR, width=_px(1, dpi))
+
+    # --- bars (first factor at the top, like the inverted matplotlib axis) ---
+    n = len(labels)
+    slot = (bottom - top) / (n + 0.2)
+    y0 = top + slot * 0.6
+
+    bar_points: list[tuple[float, float]] = []
+    for i, lbl in enumerate(labels):
+        cy = y0 + i * slot
+        bars = [(country_vals[i], COUNTRY_COLOR, -0.175 if show_eu else 0.0, 0.35 if show_eu else 0.8)]
+        if show_eu:
+            bars.append((eu_vals[i], EU_COLOR, 0.175, 0.35))
+        for v, color, offset, h in bars:
+            if not np.isfinite(v):
+                continue
+            x_a, x_b = sorted((x_px(0), x_px(float(v))))
+            yc = cy + offset * slot
+            draw.rectangle([x_a, yc - h * slot / 2, x_b, yc + h * slot / 2], fill=color)
+            bar_points.extend((x, yc) for x in np.linspace(x_a, x_b, 20))
+
+        draw.line([(left - tick_len, cy), (left, cy)], fill=TEXT_COLOR, width=_px(1, dpi))
+        draw.text((left - tick_len - pad, cy), lbl, font=tick_font, fill=TEXT_COLOR, anchor="rm")
+
+    # --- spines + axis labels ---
+    draw.rectangle([left, top, right, bottom], outline=GRID_COLOR, width=_px(1, dpi))
+    draw.text(
+        ((left + right) / 2, height - _px(6, dpi)),
+        "Contribution to happiness score",
+        font=label_font, fill=TEXT_COLOR, anchor="mb",
+    )
+    _draw_rotated_text(img, "Contributing factors", label_font, (_px(6, dpi) + label_font.size // 2, (top + bottom) // 2))
+
+    if show_eu:
+        entries = [(geo_area, COUNTRY_COLOR, "bar"), (eu_label, EU_COLOR, "bar")]
+        corner = _best_legend_corner(_legend_size(entries, dpi), (left, top, right, bottom), bar_points, dpi)
+        _draw_legend(draw, entries, *corner, dpi)
+
+    return image_bytes(img, fmt)
+
+
+def render_timeline_png(
+    years: list[int],
+    c_vals,
+    eu_vals,
+    ylim: tuple[float, float],
+    geo_area: str,
+    show_eu: bool = False,
+    fmt: str = "png",
+    dpi: int = DPI,
+    eu_label: str = "EU average",
+) -> bytes:
+    width, height = BASE_WIDTH * dpi, BASE_HEIGHT_GRAPH * dpi
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    tick_font = load_font(_px(TICK_SIZE, dpi))
+    label_font = load_font(_px(AXIS_LABEL_SIZE, dpi))
+    tick_len = _px(3.5, dpi)
+    pad = _px(3.5, dpi)
+
+    ymin, ymax = ylim
+    yticks = _ticks(ymin, ymax)
+    ytick_labels = _tick_labels(yticks)
+
+    ylabel_w = max(_text_size(tick_font, lbl)[0] for lbl in ytick_labels)
+    left = _px(6, dpi) + label_font.size + _px(6, dpi) + ylabel_w + pad + tick_len
+    right = width - _px(12, dpi)
+    top = _px(12, dpi)
+    bottom = height - (_px(6, dpi) + label_font.size + _px(X_LABEL_PADDING, dpi) + tick_font.size + pad + tick_len)
+
+    # matplotlib's default 5% x margin around the first/last year
+    span = years[-1] - years[0]
+    xmin, xmax = years[0] - 0.05 * span, years[-1] + 0.05 * span
+
+    def x_px(v: float) -> float:
+        return left + (v - xmin) / (xmax - xmin) * (right - left)
+
+    def y_px(v: float) -> float:
+        return bottom - (v - ymin) / (ymax - ymin) * (bottom - top)
+
+    for t, lbl in zip(yticks, ytick_labels):
+        y = y_px(t)
+        draw.line([(left, y), (right, y)], fill=GRID_COLOR, width=_px(1, dpi))
+        draw.line([(left - tick_len, y), (left, y)], fill=TEXT_COLOR, width=_px(1, dpi))
+        draw.text((left - tick_len - pad, y), lbl, font=tick_font, fill=TEXT_COLOR, anchor="rm")
+
+    for yr in years:
+        x = x_px(yr)
+        draw.line([(x, bottom), (x, bottom + tick_len)], fill=TEXT_COLOR, width=_px(1, dpi))
+        draw.text((x, bottom + tick_len + pad), str(yr), font=tick_font, fill=TEXT_COLOR, anchor="mt")
+
+    line_points: list[tuple[float, float]] = []
+
+    def _series(vals, color, dashed=False):
+        pts = [(x_px(x), y_px(float(v))) for x, v in zip(years, vals) if np.isfinite(v)]
+        line_points.extend(_segment_samples(pts))
+        if dashed:
+            for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+                steps = max(1, int(np.hypot(xb - xa, yb - ya) // _px(7, dpi)))
+                for k in range(0, steps, 2):
+                    f0, f1 = k / steps, min(k + 1, steps) / steps
+                    draw.line([(xa + (xb - xa) * f0, ya + (yb - ya) * f0), (xa + (xb - xa) * f1, ya + (yb - ya) * f1)], fill=color, width=_px(2, dpi))
+        elif len(pts) > 1:
+            draw.line(pts, fill=color, width=_px(2, dpi), joint="curve")
+        r = _px(3, dpi)
+        for x, y in pts:
+            draw.ellipse([x - r, y - r, x + r, y + r], fill=color)
+
+    _series(c_vals, COUNTRY_COLOR)
+    entries = [(geo_area, COUNTRY_COLOR, "line")]
+    if show_eu:
+        _series(eu_vals, EU_COLOR, dashed=True)
+        entries.append((eu_label, EU_COLOR, "dashed"))
+
+    draw.rectangle([left, top, right, bottom], outline=GRID_COLOR, width=_px(1, dpi))
+    draw.text(((left + right) / 2, height - _px(6, dpi)), "Year", font=label_font, fill=TEXT_COLOR, anchor="mb")
+    _draw_rotated_text(img, "Happiness (ladder) score", label_font, (_px(6, dpi) + label_font.size // 2, (top + bottom) // 2))
+    corner = _best_legend_corner(_legend_size(entries, dpi), (left, top, right, bottom), line_points, dpi)
+    _draw_legend(draw, entries, *corner, dpi)
+
+    return image_bytes(img, fmt)
+
+
+def plot_contribution_bar_chart_pil(
+    df: pd.DataFrame,
+    geo_area: str,
+    year: int | str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    fmt: str = "png",
+    dpi: int | None = None,
+    overlay: CountryGroup | None = None,
+) -> BytesIO:
+    labels, country_vals, eu_vals = compute_region_factors(df, geo_area, year, overlay)
+    country_vals = np.asarray(country_vals, dtype=float)
+    eu_vals = np.asarray(eu_vals, dtype=float)
+
+    xlim = bar_xlim(country_vals, fixed_scale)
+    return BytesIO(render_contribution_bar_png(labels, country_vals, eu_vals, xlim, geo_area, show_eu, fmt, dpi or DPI, overlay_label(overlay)))
+
+
+def plot_time_line_graph_pil(
+    df: pd.DataFrame,
+    geo_area: str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    fmt: str = "png",
+    dpi: int | None = None,
+    overlay: CountryGroup | None = None,
+) -> BytesIO:
+    years, c_vals, eu_vals = _compute_series(df, geo_area, overlay)
+    ylim = timeline_ylim(c_vals, eu_vals, fixed_scale)
+    return BytesIO(render_timeline_png(years, c_vals, eu_vals, ylim, geo_area, show_eu, fmt, dpi or DPI, overlay_label(overlay)))
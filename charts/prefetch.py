@@ -0,0 +1,106 @@
+# charts/prefetch.py
+#
+# Predictive background renders. After a country's first chart request,
+# queue the views users usually click next (other years, the other
+# show_eu/fixed_scale toggles, the timeline) so they come from the cache.
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from threading import BoundedSemaphore, Lock
+from typing import Any
+
+from charts.prewarm import FLAGS, YEARS
+from charts.render_service import ChartRenderer, ChartSpec, CONTRIB_BAR, TIMELINE
+
+
+def adjacent_specs(spec: ChartSpec) -> list[ChartSpec]:
+    """
+    Likely next views for spec's country, most likely first: same toggles
+    in other years, the matching timeline, then the other toggle combos.
+    Engine, format and size stay as requested.
+    """
+    spec = spec.normalized()
+    year = spec.year or YEARS[-1]
+
+    def bar(y, show_eu, fixed_scale):
+        return replace(spec, kind=CONTRIB_BAR, year=y, show_eu=show_eu, fixed_scale=fixed_scale)
+
+    def line(show_eu, fixed_scale):
+        return replace(spec, kind=TIMELINE, year=None, show_eu=show_eu, fixed_scale=fixed_scale)
+
+    out = [bar(y, spec.show_eu, spec.fixed_scale) for y in YEARS]
+    out.append(line(spec.show_eu, spec.fixed_scale))
+    for show_eu, fixed_scale in FLAGS:
+        out.append(bar(year, show_eu, fixed_scale))
+        out.append(line(show_eu, fixed_scale))
+    for show_eu, fixed_scale in FLAGS:
+        out.extend(bar(y, show_eu, fixed_scale) for y in YEARS)
+
+    seen = {spec}
+    ordered = []
+    for s in out:
+        s = s.normalized()
+        if s not in seen:
+            seen.add(s)
+            ordered.append(s)
+    return ordered
+
+
+class Prefetcher:
+    """
+    Runs adjacent renders on a small dedicated thread pool, separate from
+    the request threadpool. At most max_pending renders are queued; beyond
+    that, prefetches are dropped rather than delaying real requests.
+    """
+
+    def __init__(self, renderer: ChartRenderer, workers: int = 1, max_pending: int = 32):
+        self.renderer = renderer
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-prefetch")
+        self._budget = BoundedSemaphore(max_pending)
+        self._seen: set[tuple] = set()
+        self._lock = Lock()
+        self.scheduled = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def on_request(self, spec: ChartSpec) -> None:
+        spec = spec.normalized()
+        country_key = (spec.geo_area, spec.engine, spec.fmt, spec.dpi)
+        with self._lock:
+            if country_key in self._seen:
+                return
+            self._seen.add(country_key)
+
+        for nxt in adjacent_specs(spec):
+            if self.renderer.is_cached(nxt):
+                continue
+            if not self._budget.acquire(blocking=False):
+                with self._lock:
+                    self.dropped += 1
+                continue
+            with self._lock:
+                self.scheduled += 1
+            self._executor.submit(self._render, nxt)
+
+    def _render(self, spec: ChartSpec) -> None:
+        try:
+            self.renderer.fill(spec)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+        finally:
+            self._budget.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "countries_seen": len(self._seen),
+                "scheduled": self.scheduled,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
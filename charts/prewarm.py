@@ -0,0 +1,76 @@
+# charts/prewarm.py
+#
+# Render every chart permutation up front so no real request pays for a
+# cold render (or for matplotlib's first-use font discovery).
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+import os
+
+import pandas as pd
+from matplotlib import font_manager
+
+from helpers.data_cube import as_cube
+from charts.chart_style import BASE_DPI
+from charts.figure_templates import figure_bytes, new_figure
+from charts.render_service import ChartRenderer, ChartSpec, CONTRIB_BAR, TIMELINE, MATPLOTLIB, DEFAULT_FORMAT
+
+YEARS = [2021, 2022, 2023]
+FLAGS = [(False, False), (True, False), (False, True), (True, True)]  # (show_eu, fixed_scale), most used first
+
+
+def chart_permutations(
+    df: pd.DataFrame,
+    engine: str = MATPLOTLIB,
+    fmt: str = DEFAULT_FORMAT,
+    dpi: int = BASE_DPI,
+) -> list[ChartSpec]:
+    # Every country being served: the EU subset, or the world in world mode
+    countries = as_cube(df).countries
+
+    specs = []
+    for country in countries:
+        for show_eu, fixed_scale in FLAGS:
+            for year in YEARS:
+                specs.append(ChartSpec(CONTRIB_BAR, country, year, show_eu, fixed_scale, engine, fmt, dpi))
+            specs.append(ChartSpec(TIMELINE, country, None, show_eu, fixed_scale, engine, fmt, dpi))
+    return [s.normalized() for s in specs]
+
+
+def warm_font_cache() -> None:
+    """Load the font list and rasterize some text once."""
+    font_manager.findfont(font_manager.FontProperties(family="DejaVu Sans"))
+    fig, ax = new_figure(2, 1)
+    ax.set_title("warm-up 0123456789")
+    figure_bytes(fig)
+
+
+def prewarm(renderer: ChartRenderer, specs: list[ChartSpec], workers: int | None = None) -> dict[str, Any]:
+    """
+    Render specs into renderer's cache in parallel. Failures are counted,
+    not raised, so one bad country can't stop the API from starting.
+    The cache should hold len(specs) images, or the warm-up evicts itself.
+    """
+    t0 = time.perf_counter()
+    warm_font_cache()
+
+    workers = workers or (renderer.pool.size if renderer.pool is not None else os.cpu_count() or 1)
+
+    def _one(spec: ChartSpec) -> bool:
+        try:
+            renderer.fill(spec)
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        ok = list(ex.map(_one, specs))
+
+    return {
+        "charts": len(specs),
+        "rendered": sum(ok),
+        "failed": len(ok) - sum(ok),
+        "workers": workers,
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
@@ -0,0 +1,105 @@
+# charts/render_pool.py
+#
+# Optional process-pool backend for chart rendering.
+# pyplot keeps global state and holds the GIL while drawing, so renders in
+# the API's threadpool effectively run one at a time. Sending them to worker
+# processes lets one uvicorn worker use every core for matplotlib.
+
+import os
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import Lock
+
+import pandas as pd
+
+from charts.render_service import ChartSpec, render_chart
+
+# Dataset held by each worker process (set once by _init_worker)
+_worker_df: pd.DataFrame | None = None
+
+
+def _init_worker(df: pd.DataFrame) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+    global _worker_df
+    _worker_df = df
+
+
+def _render_in_worker(spec: ChartSpec) -> bytes:
+    if _worker_df is None:
+        raise RuntimeError("Render worker started without a dataset")
+    return render_chart(_worker_df, spec)
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+class ProcessRenderPool:
+    """
+    Warm pool of worker processes, each holding its own copy of the dataset.
+    render() blocks the calling thread until the image is ready or timeout
+    seconds have passed (raises TimeoutError).
+    """
+
+    def __init__(self, df: pd.DataFrame, size: int | None = None, timeout: float = 10.0):
+        self.df = df
+        self.size = max(1, int(size or os.cpu_count() or 1))
+        self.timeout = float(timeout)
+        self._lock = Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: the parent has threads (uvicorn, threadpool) running
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.df,),
+        )
+
+    def warm(self) -> list[int]:
+        """Start every worker now so the first real request doesn't pay for it."""
+        futures = [self._executor.submit(_worker_pid) for _ in range(self.size)]
+        return sorted({f.result(timeout=max(self.timeout, 60.0)) for f in futures})
+
+    def render(self, spec: ChartSpec) -> bytes:
+        executor = self._executor
+        try:
+            future = executor.submit(_render_in_worker, spec)
+        except BrokenProcessPool:
+            executor = self._restart(executor)
+            future = executor.submit(_render_in_worker, spec)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Chart render exceeded {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died mid-render; replace the pool for the next request
+            self._restart(executor)
+            raise RuntimeError("Chart render worker crashed")
+        except CancelledError:
+            # Queued on a pool that was torn down after another render crashed it
+            raise RuntimeError("Chart render worker crashed")
+
+    def _restart(self, failed: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Replace failed with a fresh pool, unless another thread already did;
+        every thread that saw the same crash ends up on one new pool.
+        """
+        with self._lock:
+            if self._executor is not failed:
+                return self._executor
+            self._executor = fresh = self._new_executor()
+        failed.shutdown(wait=False, cancel_futures=True)
+        return fresh
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, int | float]:
+        return {"workers": self.size, "timeout": self.timeout}
@@ -0,0 +1,295 @@
+# charts/render_service.py
+
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+
+from helpers.cache_helpers import LRUCache, SingleFlight, dataset_version
+from helpers.country_groups import CountryGroup
+from helpers.png_helpers import PngOptimizeStats, optimize_png
+from charts.chart_style import BASE_WIDTH, BASE_WIDTH_MULTI, BASE_HEIGHT_BAR, BASE_HEIGHT_GRAPH, BASE_DPI, DPI_BUCKETS
+from charts.contribution_bar_chart import plot_contribution_bar_chart, plot_contribution_small_multiples
+from charts.time_line_graph import plot_time_line_graph, MAX_TIMELINE_COUNTRIES
+from charts.pil_charts import plot_contribution_bar_chart_pil, plot_time_line_graph_pil, PIL_FORMATS
+
+CONTRIB_BAR = "contrib_bar"
+TIMELINE = "timeline"
+CONTRIB_YEARS = "contrib_bar_years"  # small multiples, one panel per year
+CHART_KINDS = (CONTRIB_BAR, TIMELINE, CONTRIB_YEARS)
+
+# Rendering engines: full matplotlib, or the lightweight Pillow drawer
+MATPLOTLIB = "matplotlib"
+PIL = "pil"
+ENGINES = (MATPLOTLIB, PIL)
+
+# Output formats, in the order we prefer them when the client accepts several
+MEDIA_TYPES = {
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "png": "image/png",
+}
+DEFAULT_FORMAT = "png"
+
+_PLOTTERS = {
+    (CONTRIB_BAR, MATPLOTLIB): plot_contribution_bar_chart,
+    (CONTRIB_BAR, PIL): plot_contribution_bar_chart_pil,
+    (TIMELINE, MATPLOTLIB): plot_time_line_graph,
+    (TIMELINE, PIL): plot_time_line_graph_pil,
+    (CONTRIB_YEARS, MATPLOTLIB): plot_contribution_small_multiples,
+}
+
+# Base figure size (inches) per chart kind
+FIGURE_SIZES = {
+    CONTRIB_BAR: (BASE_WIDTH, BASE_HEIGHT_BAR),
+    TIMELINE: (BASE_WIDTH, BASE_HEIGHT_GRAPH),
+    CONTRIB_YEARS: (BASE_WIDTH_MULTI, BASE_HEIGHT_BAR),
+}
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """
+    Everything that determines the bytes of one chart image.
+    Always build through normalized() so equivalent requests share a key.
+    """
+    kind: str
+    geo_area: str
+    year: int | None = None
+    show_eu: bool = False
+    fixed_scale: bool = False
+    engine: str = MATPLOTLIB
+    fmt: str = DEFAULT_FORMAT
+    dpi: int = BASE_DPI
+    compare: tuple[str, ...] = ()  # timeline only: extra countries overlaid
+    overlay: CountryGroup | None = None  # comparison group drawn instead of the EU average
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.fmt]
+
+    def normalized(self) -> "ChartSpec":
+        if self.kind not in CHART_KINDS:
+            raise ValueError(f"Unknown chart kind '{self.kind}'")
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown render engine '{self.engine}' (expected one of {list(ENGINES)})")
+
+        fmt = str(self.fmt).lower()
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unknown image format '{self.fmt}' (expected one of {list(MEDIA_TYPES)})")
+
+        # Vector output, and the multi-panel charts, only come from matplotlib
+        engine = self.engine
+        if engine == PIL and (fmt not in PIL_FORMATS or (self.kind, PIL) not in _PLOTTERS):
+            engine = MATPLOTLIB
+
+        # SVG scales freely, so every size shares one cache entry
+        dpi = BASE_DPI if fmt == "svg" else snap_dpi(self.dpi)
+
+        year = None
+        if self.kind == CONTRIB_BAR:
+            if self.year is None:
+                raise ValueError("contrib_bar requires a year")
+            year_str = str(self.year)
+            if len(year_str) == 2:
+                year_str = f"20{year_str}"
+            year = int(year_str)
+
+        geo_area = str(self.geo_area).strip()
+
+        # Overlay countries in request order, without repeats or the main country
+        compare = ()
+        if self.kind == TIMELINE:
+            names = [str(c).strip() for c in self.compare]
+            compare = tuple(dict.fromkeys(c for c in names if c and c != geo_area))
+            if len(compare) + 1 > MAX_TIMELINE_COUNTRIES:
+                raise ValueError(f"At most {MAX_TIMELINE_COUNTRIES} countries per timeline")
+            if compare:
+                engine = MATPLOTLIB  # overlays only come from matplotlib
+
+        # The overlay only shows (and only changes the bytes) alongside show_eu
+        overlay = self.overlay if self.show_eu else None
+
+        return ChartSpec(
+            kind=self.kind,
+            geo_area=geo_area,
+            year=year,
+            show_eu=bool(self.show_eu),
+            fixed_scale=bool(self.fixed_scale),
+            engine=engine,
+            fmt=fmt,
+            dpi=dpi,
+            compare=compare,
+            overlay=overlay,
+        )
+
+
+def snap_dpi(dpi: float) -> int:
+    """Smallest allowed dpi bucket at least as large as dpi (capped at the largest)."""
+    for bucket in DPI_BUCKETS:
+        if dpi <= bucket:
+            return bucket
+    return DPI_BUCKETS[-1]
+
+
+def requested_dpi(
+    kind: str,
+    width: int | None = None,
+    height: int | None = None,
+    dpi: int | None = None,
+) -> int:
+    """
+    Turn ?width= / ?height= / ?dpi= into a dpi bucket. Figures keep their
+    aspect ratio, so width wins over height, and height over dpi.
+    """
+    base_width, base_height = FIGURE_SIZES.get(kind, (BASE_WIDTH, BASE_HEIGHT_GRAPH))
+    if width:
+        return snap_dpi(width / base_width)
+    if height:
+        return snap_dpi(height / base_height)
+    if dpi:
+        return snap_dpi(dpi)
+    return BASE_DPI
+
+
+def negotiate_format(accept: str | None, requested: str | None = None) -> str:
+    """
+    Pick the output format: an explicit ?format= wins, otherwise the
+    best-q media type named in the Accept header. Wildcards (image/*, */*)
+    get PNG so existing clients keep receiving what they always have.
+    """
+    if requested:
+        return requested.lower()
+    if not accept:
+        return DEFAULT_FORMAT
+
+    by_media = {media: fmt for fmt, media in MEDIA_TYPES.items()}
+    best_fmt, best_q = DEFAULT_FORMAT, 0.0
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        fmt = by_media.get(media.lower())
+        if fmt is None:
+            continue
+
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+
+        # Ties go to the format listed first in MEDIA_TYPES
+        rank = list(MEDIA_TYPES).index(fmt)
+        if q > best_q or (q == best_q and q > 0 and rank < list(MEDIA_TYPES).index(best_fmt)):
+            best_fmt, best_q = fmt, q
+
+    return best_fmt
+
+
+def render_chart(df: pd.DataFrame, spec: ChartSpec) -> bytes:
+    plot = _PLOTTERS[(spec.kind, spec.engine)]
+    extra = {"overlay": spec.overlay} if spec.overlay is not None else {}
+    if spec.kind == CONTRIB_BAR:
+        buf = plot(
+            df,
+            geo_area=spec.geo_area,
+            year=spec.year,
+            show_eu=spec.show_eu,
+            fixed_scale=spec.fixed_scale,
+            fmt=spec.fmt,
+            dpi=spec.dpi,
+            **extra,
+        )
+    else:
+        if spec.compare:
+            extra["compare"] = spec.compare
+        buf = plot(
+            df,
+            geo_area=spec.geo_area,
+            show_eu=spec.show_eu,
+            fixed_scale=spec.fixed_scale,
+            fmt=spec.fmt,
+            dpi=spec.dpi,
+            **extra,
+        )
+    return buf.getvalue()
+
+
+class ChartRenderer:
+    """
+    Renders chart specs against one dataset, keeping the image bytes in an LRU.
+    Keys are (dataset version, normalized spec); the dataset never changes
+    between restarts so entries never need invalidating.
+
+    Cache misses go through a SingleFlight, so a burst of identical requests
+    (e.g. every client loading the dashboard at once) costs one render.
+
+    pool is an optional charts.render_pool.ProcessRenderPool; without one,
+    renders run in the calling thread. With optimize_png, PNGs are
+    palette-quantized once before they go into the cache.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 256, pool=None, optimize_png: bool = False):
+        self.df = df
+        self.pool = pool
+        self.optimize_png = optimize_png
+        self.png_stats = PngOptimizeStats()
+        self.version = dataset_version(df)
+        self.cache = LRUCache(cache_size)
+        self.flight = SingleFlight()
+
+    def get(self, spec: ChartSpec) -> bytes:
+        spec = spec.normalized()
+        key = (self.version, spec)
+
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        return self.flight.do(key, lambda: self._render_and_store(key, spec))
+
+    def fill(self, spec: ChartSpec) -> bytes:
+        """
+        get for background warm-ups: renders spec into the cache without
+        counting towards the request hit/miss stats.
+        """
+        spec = spec.normalized()
+        key = (self.version, spec)
+
+        data = self.cache.peek(key)
+        if data is not None:
+            return data
+        return self.flight.do(key, lambda: self._render_and_store(key, spec))
+
+    def is_cached(self, spec: ChartSpec) -> bool:
+        return (self.version, spec.normalized()) in self.cache
+
+    def _render_and_store(self, key: tuple, spec: ChartSpec) -> bytes:
+        # A previous flight may have finished between our miss and now
+        # (peek: the caller already counted this lookup, or is a warm-up)
+        hit = self.cache.peek(key)
+        if hit is not None:
+            return hit
+
+        if self.pool is not None:
+            data = self.pool.render(spec)
+        else:
+            data = render_chart(self.df, spec)
+
+        if self.optimize_png and spec.fmt == "png":
+            before = len(data)
+            data = optimize_png(data)
+            self.png_stats.record(before, len(data))
+
+        self.cache.put(key, data)
+        return data
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "dataset_version": self.version,
+            **self.cache.stats(),
+            "single_flight": self.flight.stats(),
+            "backend": "process" if self.pool is not None else "thread",
+            **({"pool": self.pool.stats()} if self.pool is not None else {}),
+            "png_optimize": {"enabled": self.optimize_png, **self.png_stats.stats()},
+        }
@@ -76,13 +76,18 @@
 
 # charts/score_card.py
 
+from dataclasses import dataclass
 from typing import Any
 import numpy as np
 import pandas as pd
 
-from charts.time_line_graph import _compute_series
+from helpers.cache_helpers import LRUCache, dataset_version
+from helpers.data_cube import as_cube
+from helpers.country_groups import CountryGroup, overlay_means
 from charts.chart_style import EU_DELTA_MIN, EU_DELTA_MAX
 
+YEARS = [2021, 2022, 2023]
+
 
 FACTORS = [
     "GDP",
@@ -126,162 +131,223 @@ def build_score_card_title(geo_area: str, year: int | str, show_eu: bool = False
     return f"Happiness (ladder) score for {geo_area} in {year_full}" + (" vs EU average" if show_eu else "")
 
 
-def _eu_country_list(df: pd.DataFrame) -> list[str]:
-    if "population_EU_only" not in df.columns:
-        raise ValueError("EU logic requires 'population_EU_only' column")
+# -----------------------------
+# Ranking index
+# - ranks for the ladder score and every factor, for every year, built once
+#   per dataset; each (year, metric) keeps values, a presorted best-to-worst
+#   order and a rank per country, so lookups and league tables never re-sort
+# -----------------------------
+SCORE = "score"
+METRICS = (SCORE, *FACTORS)
+
+# Which countries are ranked: EU members only, or every country in df
+EU_SCOPE = "eu"
+WORLD_SCOPE = "world"
+SCOPES = (EU_SCOPE, WORLD_SCOPE)
 
-    eu_agg_df = df[df["population_EU_only"].notna()].copy()
-    if eu_agg_df.empty:
-        raise ValueError("No EU rows found (population_EU_only is empty)")
 
-    if "country" not in eu_agg_df.columns:
-        raise ValueError("EU logic requires 'country' column")
+def cube_metric(metric: str) -> str:
+    return "ladder_score" if metric == SCORE else metric
 
-    eu_countries = (
-        eu_agg_df["country"]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .unique()
-        .tolist()
-    )
-    return [c for c in eu_countries if c]
 
+@dataclass(frozen=True)
+class Ranking:
+    """One (year, metric): values and ranks aligned with RankingIndex.countries."""
+    values: np.ndarray  # float, NaN where missing
+    order: np.ndarray   # country positions, best first; unranked excluded
+    ranks: np.ndarray   # 1 = best, 0 = unranked
+    by_region: dict[str, np.ndarray]  # order restricted to each region
+    region_ranks: np.ndarray  # rank within the country's own region, 0 = unranked
 
-def _year_suffix(year: int | str) -> str:
-    ys = str(year)
-    if len(ys) == 4:
-        ys = ys[-2:]
-    return ys
+    @property
+    def total(self) -> int:
+        return len(self.order)
 
 
-def _rank_desc(values_by_country: dict[str, float | None]) -> tuple[dict[str, int | None], int]:
+class RankingIndex:
     """
-    Rank 1 = best (largest), rank N = worst (smallest).
-    Countries with None are unranked (rank=None).
-    Returns: (rank_by_country, total_ranked)
+    Rankings over the EU countries of df (population_EU_only present), or
+    over every country with scope="world": per-country mean, higher is
+    better unless FACTOR_DIRECTION flips it, ties keep dataset order.
+    Each country also gets its rank within its region.
     """
-    items = [(c, v) for c, v in values_by_country.items() if v is not None and np.isfinite(v)]
-    if not items:
-        return {c: None for c in values_by_country.keys()}, 0
 
-    # Sort high->low
-    items.sort(key=lambda x: float(x[1]), reverse=True)
-    total = len(items)
+    def __init__(self, df: pd.DataFrame, scope: str = EU_SCOPE):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown ranking scope '{scope}' (expected one of {list(SCOPES)})")
+        self.version = dataset_version(df)
+        self.scope = scope
+        cube = as_cube(df)
+
+        eu = np.flatnonzero(cube.eu_mask)
+        if not len(eu):
+            raise ValueError("No EU rows found (population_EU_only is empty)")
+        ranked = eu if scope == EU_SCOPE else np.arange(len(cube.countries))
+        self.countries = [cube.countries[i] for i in ranked]
+        self.position = {c: i for i, c in enumerate(self.countries)}
+        self.regions = cube.regions[ranked]
+        self.region_names = sorted({r for r in self.regions if r is not None})
+
+        y = np.array([cube.year_index(yr) for yr in YEARS], dtype=int)
+        m = cube.metric_indices([cube_metric(mt) for mt in METRICS])
+        values = cube.values[np.ix_(ranked, y, m)]
+        eu_means = cube.eu_mean()[np.ix_(y, m)]
+
+        self.eu_means = {(yr, mt): float(eu_means[j, k]) for j, yr in enumerate(YEARS) for k, mt in enumerate(METRICS)}
+
+        self.rankings: dict[tuple[int, str], Ranking] = {}
+        for j, yr in enumerate(YEARS):
+            for k, mt in enumerate(METRICS):
+                vals = values[:, j, k]
+                keyed = vals * FACTOR_DIRECTION.get(mt, 1)
+                finite = np.flatnonzero(np.isfinite(keyed))
+                order = finite[np.argsort(-keyed[finite], kind="stable")]
+                ranks = np.zeros(len(vals), dtype=int)
+                ranks[order] = np.arange(1, len(order) + 1)
+                by_region = {r: order[self.regions[order] == r] for r in self.region_names}
+                region_ranks = np.zeros(len(vals), dtype=int)
+                for members in by_region.values():
+                    region_ranks[members] = np.arange(1, len(members) + 1)
+                self.rankings[(yr, mt)] = Ranking(vals, order, ranks, by_region, region_ranks)
+
+    def ranking(self, year: int, metric: str = SCORE) -> Ranking:
+        key = (int(year), metric)
+        if key not in self.rankings:
+            raise ValueError(f"No ranking for metric '{metric}' in {year} (metrics: {list(METRICS)}, years: {YEARS})")
+        return self.rankings[key]
+
+    def value(self, country: str, year: int, metric: str = SCORE) -> float | None:
+        i = self.position.get(str(country).strip())
+        if i is None:
+            return None
+        v = self.ranking(year, metric).values[i]
+        return float(v) if np.isfinite(v) else None
+
+    def rank(self, country: str, year: int, metric: str = SCORE) -> tuple[int | None, int]:
+        """(rank, total ranked); rank is None for unknown or unranked countries."""
+        r = self.ranking(year, metric)
+        i = self.position.get(str(country).strip())
+        if i is None or r.ranks[i] == 0:
+            return None, r.total
+        return int(r.ranks[i]), r.total
+
+    def region_rank(self, country: str, year: int, metric: str = SCORE) -> tuple[str | None, int | None, int]:
+        """(region, rank within it, total ranked in it); rank is None when unranked."""
+        r = self.ranking(year, metric)
+        i = self.position.get(str(country).strip())
+        if i is None or self.regions[i] is None:
+            return None, None, 0
+        region = self.regions[i]
+        total = len(r.by_region[region])
+        if r.region_ranks[i] == 0:
+            return region, None, total
+        return region, int(r.region_ranks[i]), total
+
+    def table(
+        self,
+        year: int,
+        metric: str = SCORE,
+        descending: bool = True,
+        region: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> dict[str, Any]:
+        """One page of the league table: a slice of the presorted order."""
+        r = self.ranking(year, metric)
+        order = r.order
+        if region is not None:
+            if region not in r.by_region:
+                raise ValueError(f"Unknown region '{region}' (expected one of {self.region_names})")
+            order = r.by_region[region]
+        if not descending:
+            order = order[::-1]
+
+        page = order[offset:offset + limit]
+        return {
+            "year": int(year),
+            "metric": metric,
+            "scope": self.scope,
+            "order": "desc" if descending else "asc",
+            "region": region,
+            "total": len(order),
+            "offset": offset,
+            "limit": limit,
+            "items": [
+                {
+                    "rank": int(r.ranks[i]),
+                    "region_rank": int(r.region_ranks[i]),
+                    "country": self.countries[i],
+                    "region": self.regions[i],
+                    "value": float(r.values[i]),
+                }
+                for i in page
+            ],
+        }
+
 
-    rank_by_country: dict[str, int | None] = {c: None for c in values_by_country.keys()}
-    for i, (c, _v) in enumerate(items, start=1):
-        rank_by_country[c] = i
+_indexes = LRUCache(4)
 
-    return rank_by_country, total
 
+def ranking_index(df: pd.DataFrame, scope: str = EU_SCOPE) -> RankingIndex:
+    """Index for df, rebuilt only when the data (its dataset_version) changes."""
+    key = (dataset_version(df), scope)
+    index = _indexes.get(key)
+    if index is None:
+        index = RankingIndex(df, scope)
+        _indexes.put(key, index)
+    return index
 
-def get_score_card_values(df: pd.DataFrame, geo_area: str, year: int | str) -> dict[str, Any]:
-    # --- current-year ladder + EU series (reuses your proven logic) ---
-    years, c_vals, eu_vals = _compute_series(df, geo_area)
 
-    year_int = int(year)
-    if year_int not in years:
-        raise ValueError(f"Year {year_int} not available in series: {years}")
+def get_score_card_values(
+    df: pd.DataFrame,
+    geo_area: str,
+    year: int | str,
+    index: RankingIndex | None = None,
+    overlay: CountryGroup | None = None,
+) -> dict[str, Any]:
+    """
+    Score card for one country and year. Everything comes from the ranking
+    index (built once per dataset), so a call is a handful of lookups.
+    With an overlay group, its average score is added alongside the EU's.
+    """
+    index = index or ranking_index(df)
+    geo_area = str(geo_area).strip()
 
-    idx = years.index(year_int)
+    year_int = int(year)
+    if year_int not in YEARS:
+        raise ValueError(f"Year {year_int} not available in series: {YEARS}")
+    if geo_area not in index.position:
+        raise ValueError(f"No rows found for country '{geo_area}'")
 
-    c = float(c_vals[idx]) if np.isfinite(c_vals[idx]) else None
-    eu = float(eu_vals[idx]) if np.isfinite(eu_vals[idx]) else None
+    c = index.value(geo_area, year_int)
+    eu = index.eu_means[(year_int, SCORE)]
+    eu = eu if np.isfinite(eu) else None
 
     delta_vs_eu = None
     if c is not None and eu is not None:
         delta_vs_eu = c - eu
 
-    # --- EU ranks: overall ladder score ---
-    eu_countries = _eu_country_list(df)
-
-    overall_by_country: dict[str, float | None] = {}
-    for cn in eu_countries:
-        try:
-            ys, cv, _ev = _compute_series(df, cn)
-            if year_int in ys:
-                j = ys.index(year_int)
-                vv = float(cv[j]) if np.isfinite(cv[j]) else None
-            else:
-                vv = None
-        except Exception:
-            vv = None
-        overall_by_country[cn] = vv
-
-    overall_rank_map, overall_total = _rank_desc(overall_by_country)
-
-    # --- EU ranks: per-factor contributions (selected year only) ---
-    ysuf = _year_suffix(year_int)
-    factor_cols = [f"{f}_{ysuf}" for f in FACTORS]
-
-    missing = [cname for cname in factor_cols if cname not in df.columns]
-    if missing:
-        raise ValueError(f"Missing expected factor columns for year 20{ysuf}: {missing}")
-
-    # Compute country factor values (same approach as your bar chart: mean over rows for that country)
-    if "country" not in df.columns:
-        raise ValueError("Expected a 'country' column")
-
-    country_df = df[df["country"].notna()].copy()
-    country_df["country"] = country_df["country"].astype(str).str.strip()
-    country_df = country_df[country_df["country"].isin(eu_countries)]
-
-    # Factor values for selected geo_area
-    sel_mask = country_df["country"] == str(geo_area).strip()
-    sel_rows = country_df[sel_mask]
-    if sel_rows.empty:
-        raise ValueError(f"No rows found for country '{geo_area}'")
+    overall_rank, overall_total = index.rank(geo_area, year_int)
+    region, region_rank, region_total = index.region_rank(geo_area, year_int)
 
-    sel_factor_vals = sel_rows[factor_cols].mean().to_dict()
-    # normalize to factor keys
     factor_values: dict[str, float | None] = {}
-    for f in FACTORS:
-        v = sel_factor_vals.get(f"{f}_{ysuf}")
-        factor_values[f] = float(v) if v is not None and np.isfinite(v) else None
-
-    # Build ranks per factor
     factor_ranks: dict[str, dict[str, int | None]] = {}
     for f in FACTORS:
-        col = f"{f}_{ysuf}"
+        factor_values[f] = index.value(geo_area, year_int, f)
+        rank, total = index.rank(geo_area, year_int, f)
+        factor_ranks[f] = {"rank": rank, "total": total}
 
-        # compute mean per country
-        means = country_df.groupby("country")[col].mean()
-
-        vals_map: dict[str, float | None] = {}
-        for cn in eu_countries:
-            vv = means.get(cn, np.nan)
-            vv = float(vv) if vv is not None and np.isfinite(vv) else None
-
-            # Apply direction (invert if needed)
-            if vv is not None and FACTOR_DIRECTION.get(f, 1) == -1:
-                vv = -vv
-
-            vals_map[cn] = vv
-
-        rank_map, total = _rank_desc(vals_map)
-        factor_ranks[f] = {
-            "rank": rank_map.get(str(geo_area).strip()),
-            "total": total,
-        }
-
-    # --- 3-year deltas (as you already planned) ---
-    # Map year->score for this country
-    c_by_year: dict[int, float | None] = {}
-    for y, vv in zip(years, c_vals):
-        yi = int(y)
-        c_by_year[yi] = float(vv) if np.isfinite(vv) else None
-
-    base = c_by_year.get(year_int)
+    # --- 3-year deltas vs the selected year ---
+    base = c
     deltas_vs_selected_year: dict[int, float | None] = {}
-    for yy in [2021, 2022, 2023]:
-        v = c_by_year.get(yy)
+    for yy in YEARS:
+        v = index.value(geo_area, yy)
         if base is None or v is None:
             deltas_vs_selected_year[yy] = None
         else:
             deltas_vs_selected_year[yy] = v - base
 
-    return {
+    card = {
         # existing fields
         "year": year_int,
         "country_score": c,
@@ -291,18 +357,38 @@ def get_score_card_values(df: pd.DataFrame, geo_area: str, year: int | str) -> d
         "delta_max": EU_DELTA_MAX,
 
         # 3-year delta row (kept)
-        "years": [2021, 2022, 2023],
+        "years": list(YEARS),
         "selected_year": year_int,
         "deltas_vs_selected_year": deltas_vs_selected_year,
         "year_delta_min": -1.0,
         "year_delta_max": 1.0,
 
-        # NEW: overall EU rank
-        "overall_rank": overall_rank_map.get(str(geo_area).strip()),
+        # NEW: overall rank (EU, or world with the world scope)
+        "overall_rank": overall_rank,
         "overall_total": overall_total,
+        "rank_scope": index.scope,
+
+        # rank within the country's region (ranked set as above)
+        "region": region,
+        "region_rank": region_rank,
+        "region_total": region_total,
 
         # NEW: per-factor ranks + values
         "factor_labels": FACTOR_LABELS,
         "factor_values": factor_values,
         "factor_ranks": factor_ranks,
     }
+
+    if overlay is not None:
+        cube = as_cube(df)
+        g = overlay_means(df, overlay)[cube.year_index(year_int), cube.metric_index(cube_metric(SCORE))]
+        g = float(g) if np.isfinite(g) else None
+        card["group"] = {
+            "name": overlay.name,
+            "label": overlay.label,
+            "weighted": overlay.weighted,
+            "score": g,
+            "delta": c - g if c is not None and g is not None else None,
+        }
+
+    return card
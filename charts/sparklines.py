@@ -0,0 +1,145 @@
+# charts/sparklines.py
+#
+# Ladder-score sparklines for every EU member in one sprite sheet, plus a
+# JSON index of each country's cell, so the overview grid loads with one
+# small image instead of 27 full timeline renders. Drawn with Pillow and
+# supersampled for antialiasing; sheets are cached per option set.
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw
+
+from helpers.cache_helpers import LRUCache, SingleFlight, dataset_version
+from helpers.data_filter import filter_to_eu_only
+from helpers.png_helpers import optimize_png
+from charts.chart_style import COUNTRY_COLOR, EU_COLOR, FIXED_GRAPH_MIN, FIXED_GRAPH_MAX
+from charts.pil_charts import PIL_FORMATS, image_bytes
+from charts.time_line_graph import compute_series_many
+
+CELL_WIDTH = 120
+CELL_HEIGHT = 36
+CELL_PAD = 4
+COLUMNS = 9
+SCALES = (1, 2)  # 2 for high-density screens
+SUPERSAMPLE = 4
+
+
+def sheet_layout(countries: list[str], scale: int = 1) -> dict[str, Any]:
+    """Pixel offsets of each country's cell, row-major in the given order."""
+    w, h = CELL_WIDTH * scale, CELL_HEIGHT * scale
+    cols = min(COLUMNS, len(countries)) or 1
+    rows = -(-len(countries) // cols)
+    return {
+        "width": cols * w,
+        "height": rows * h,
+        "cell": {"width": w, "height": h},
+        "countries": {
+            name: {"x": (i % cols) * w, "y": (i // cols) * h, "width": w, "height": h}
+            for i, name in enumerate(countries)
+        },
+    }
+
+
+def render_sparkline_sheet(
+    df: pd.DataFrame,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    fmt: str = "png",
+    scale: int = 1,
+) -> tuple[bytes, dict[str, Any]]:
+    """Sprite sheet bytes and its index for every country filter_to_eu_only returns."""
+    if fmt not in PIL_FORMATS:
+        raise ValueError(f"Sparklines are available as {list(PIL_FORMATS)}, not '{fmt}'")
+    if scale not in SCALES:
+        raise ValueError(f"Unknown sparkline scale {scale} (expected one of {list(SCALES)})")
+
+    countries = sorted(filter_to_eu_only(df)["country"])
+    years, c_mat, eu_vals = compute_series_many(df, countries)
+    layout = sheet_layout(countries, scale)
+
+    # Per-country scale shows each trend's shape; the fixed scale makes
+    # levels comparable across cells
+    if fixed_scale:
+        lows = np.full(len(countries), float(FIXED_GRAPH_MIN))
+        highs = np.full(len(countries), float(FIXED_GRAPH_MAX))
+    else:
+        both = np.column_stack([c_mat, np.tile(eu_vals, (len(countries), 1))]) if show_eu else c_mat
+        lows, highs = np.nanmin(both, axis=1), np.nanmax(both, axis=1)
+        flat = highs - lows < 1e-9
+        lows, highs = np.where(flat, lows - 0.5, lows), np.where(flat, highs + 0.5, highs)
+
+    ss = scale * SUPERSAMPLE
+    img = Image.new("RGBA", (layout["width"] * SUPERSAMPLE, layout["height"] * SUPERSAMPLE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    pad = CELL_PAD * ss
+    cw, ch = CELL_WIDTH * ss, CELL_HEIGHT * ss
+    xs = np.linspace(pad, cw - pad, len(years))
+
+    def _points(ox, oy, vals, lo, hi):
+        ys = oy + ch - pad - (np.asarray(vals, dtype=float) - lo) / (hi - lo) * (ch - 2 * pad)
+        return [(ox + x, y) for x, y in zip(xs, ys) if np.isfinite(y)]
+
+    for i, name in enumerate(countries):
+        cell = layout["countries"][name]
+        ox, oy = cell["x"] * SUPERSAMPLE, cell["y"] * SUPERSAMPLE
+
+        if show_eu:
+            eu_pts = _points(ox, oy, eu_vals, lows[i], highs[i])
+            draw.line(eu_pts, fill=EU_COLOR, width=ss)
+
+        pts = _points(ox, oy, c_mat[i], lows[i], highs[i])
+        if len(pts) > 1:
+            draw.line(pts, fill=COUNTRY_COLOR, width=2 * ss, joint="curve")
+        if pts:
+            x, y = pts[-1]
+            r = 2 * ss
+            draw.ellipse([x - r, y - r, x + r, y + r], fill=COUNTRY_COLOR)
+
+    img = img.resize((layout["width"], layout["height"]), Image.LANCZOS)
+
+    index = {
+        **layout,
+        "years": years,
+        "ylim": {name: [float(lows[i]), float(highs[i])] for i, name in enumerate(countries)},
+    }
+    # Rendered once per process, so spend the time on a palette PNG (~5x smaller)
+    data = image_bytes(img, fmt)
+    if fmt == "png":
+        data = optimize_png(data)
+    return data, index
+
+
+class SparklineSheets:
+    """
+    Sprite sheets rendered once per (show_eu, fixed_scale, fmt, scale) and
+    kept for the life of the process; concurrent first requests share a render.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 16):
+        self.df = df
+        self.version = dataset_version(df)
+        self.cache = LRUCache(cache_size)
+        self.flight = SingleFlight()
+
+    def get(
+        self,
+        show_eu: bool = False,
+        fixed_scale: bool = False,
+        fmt: str = "png",
+        scale: int = 1,
+    ) -> tuple[bytes, dict[str, Any]]:
+        key = (self.version, bool(show_eu), bool(fixed_scale), fmt, int(scale))
+
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+
+        def _render():
+            result = render_sparkline_sheet(self.df, show_eu, fixed_scale, fmt, scale)
+            result[1]["dataset_version"] = self.version
+            self.cache.put(key, result)
+            return result
+
+        return self.flight.do(key, _render)
@@ -1,7 +1,9 @@
 from io import BytesIO
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+from helpers.data_cube import as_cube
+from helpers.country_groups import CountryGroup, overlay_label, overlay_means
 from charts.chart_style import (
     AXIS_LABEL_SIZE,
     TICK_SIZE,
@@ -12,38 +14,196 @@ from charts.chart_style import (
     FIXED_GRAPH_MAX,
     EU_TOTAL_MIN,
     EU_TOTAL_MAX,
+    COUNTRY_COLOR,
     EU_COLOR,
 )
-
-
-def build_timeline_title(geo_area: str, show_eu: bool = False, fixed_scale: bool = False) -> str:
+from charts.figure_templates import TemplatePool, figure_bytes, new_figure, style_axes
+
+YEARS = [2021, 2022, 2023]
+LADDER_METRIC = "ladder_score"
+
+# Overlay mode: the selected country keeps COUNTRY_COLOR, comparisons take
+# the rest of the tab10 cycle minus EU orange
+MAX_TIMELINE_COUNTRIES = 8
+OVERLAY_COLORS = [
+    COUNTRY_COLOR,
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#17becf",
+]
+
+
+def build_timeline_title(
+    geo_area: str,
+    show_eu: bool = False,
+    fixed_scale: bool = False,
+    compare=(),
+    overlay: CountryGroup | None = None,
+) -> str:
+    names = [geo_area, *compare]
+    if len(names) > 1:
+        geo_area = ", ".join(names[:-1]) + f" and {names[-1]}"
     title = f"Happiness (ladder) score over time (2021–2023)\n{geo_area}"
     if show_eu:
-        title += " (vs EU average)"
+        title += f" (vs {overlay_label(overlay)})"
     return title
 
 
-def _compute_series(df: pd.DataFrame, geo_area: str):
-    years = [2021, 2022, 2023]
+def _compute_series(df: pd.DataFrame, geo_area: str, overlay: CountryGroup | None = None):
+    years, c_mat, eu_vals = compute_series_many(df, [geo_area], overlay)
+    return years, [float(v) for v in c_mat[0]], [float(v) for v in eu_vals]
+
 
-    eu_df = df[df["population_EU_only"].notna()]
-    eu_vals = [
-        float(eu_df["ladder_score_21"].mean()),
-        float(eu_df["ladder_score_22"].mean()),
-        float(eu_df["ladder_score_23"].mean()),
-    ]
+def compute_series_many(df: pd.DataFrame, geo_areas, overlay: CountryGroup | None = None):
+    """
+    Ladder series for several countries in one lookup: a fancy-index into
+    the cube, returned as an (n_countries, n_years) matrix in the requested order.
+    """
+    cube = as_cube(df)
+    y = np.array([cube.year_index(yr) for yr in YEARS], dtype=int)
+    m = cube.metric_index(LADDER_METRIC)
 
-    cdf = df[df["country"] == geo_area]
-    if cdf.empty:
-        raise ValueError(f"No rows found for country '{geo_area}'")
+    c_mat = cube.values[np.ix_(cube.country_indices(geo_areas), y, [m])][:, :, 0]
+    eu_vals = overlay_means(df, overlay)[y, m]
+    return list(YEARS), c_mat, eu_vals
 
-    c_vals = [
-        float(cdf["ladder_score_21"].mean()),
-        float(cdf["ladder_score_22"].mean()),
-        float(cdf["ladder_score_23"].mean()),
-    ]
 
-    return years, c_vals, eu_vals
+def timeline_ylim(c_vals, eu_vals, fixed_scale: bool = False) -> tuple[float, float]:
+    """
+    y-axis limits for the timeline. The zoomed scale always keeps the EU
+    total range in view so countries stay comparable.
+    """
+    if fixed_scale:
+        return FIXED_GRAPH_MIN, FIXED_GRAPH_MAX
+
+    ymin = min(list(c_vals) + list(eu_vals))
+    ymax = max(list(c_vals) + list(eu_vals))
+    ymin = min(ymin, EU_TOTAL_MIN)
+    ymax = max(ymax, EU_TOTAL_MAX)
+    pad = (ymax - ymin) * 0.08
+    return ymin - pad, ymax + pad
+
+
+class _TimelineTemplate:
+    """
+    Pre-styled timeline figure. Only line data, y limits and the legend
+    label change between renders.
+    """
+
+    def __init__(self, show_eu: bool):
+        self.fig, self.ax = new_figure(BASE_WIDTH, BASE_HEIGHT_GRAPH)
+        ax = self.ax
+
+        (self.country_line,) = ax.plot(YEARS, [0.0] * len(YEARS), marker="o", linewidth=2, label=" ")
+
+        self.eu_line = None
+        if show_eu:
+            (self.eu_line,) = ax.plot(
+                YEARS,
+                [0.0] * len(YEARS),
+                marker="o",
+                linestyle="--",
+                linewidth=2,
+                color=EU_COLOR,
+                label="EU average",
+            )
+
+        ax.set_xlabel("Year", fontsize=AXIS_LABEL_SIZE, labelpad=X_LABEL_PADDING)
+        ax.set_ylabel("Happiness (ladder) score", fontsize=AXIS_LABEL_SIZE)
+
+        ax.set_xticks(YEARS)
+        style_axes(ax, grid_axis="y")
+        self.legend = ax.legend(frameon=False, fontsize=TICK_SIZE)
+
+    def render(
+        self,
+        geo_area: str,
+        c_vals,
+        eu_vals,
+        ylim: tuple[float, float],
+        fmt: str = "png",
+        dpi: int | None = None,
+        eu_label: str = "EU average",
+    ) -> bytes:
+        self.country_line.set_ydata(c_vals)
+        if self.eu_line is not None:
+            self.eu_line.set_ydata(eu_vals)
+            self.legend.get_texts()[1].set_text(eu_label)
+        self.legend.get_texts()[0].set_text(geo_area)
+
+        self.ax.set_ylim(*ylim)
+
+        # y tick label widths depend on the limits, so re-fit the margins
+        self.fig.tight_layout()
+        return figure_bytes(self.fig, fmt, dpi)
+
+
+_templates = TemplatePool(lambda show_eu: _TimelineTemplate(show_eu))
+
+
+class _OverlayTemplate:
+    """
+    Timeline with n_countries country lines (plus the optional EU line).
+    Keyed on (show_eu, n_countries) so the line artists are fixed.
+    """
+
+    def __init__(self, show_eu: bool, n_countries: int):
+        self.fig, self.ax = new_figure(BASE_WIDTH, BASE_HEIGHT_GRAPH)
+        ax = self.ax
+
+        self.country_lines = [
+            ax.plot(YEARS, [0.0] * len(YEARS), marker="o", linewidth=2, color=OVERLAY_COLORS[i], label=" ")[0]
+            for i in range(n_countries)
+        ]
+
+        self.eu_line = None
+        if show_eu:
+            (self.eu_line,) = ax.plot(
+                YEARS,
+                [0.0] * len(YEARS),
+                marker="o",
+                linestyle="--",
+                linewidth=2,
+                color=EU_COLOR,
+                label="EU average",
+            )
+
+        ax.set_xlabel("Year", fontsize=AXIS_LABEL_SIZE, labelpad=X_LABEL_PADDING)
+        ax.set_ylabel("Happiness (ladder) score", fontsize=AXIS_LABEL_SIZE)
+
+        ax.set_xticks(YEARS)
+        style_axes(ax, grid_axis="y")
+        self.legend = ax.legend(frameon=False, fontsize=TICK_SIZE)
+
+    def render(
+        self,
+        geo_areas,
+        c_mat,
+        eu_vals,
+        ylim: tuple[float, float],
+        fmt: str = "png",
+        dpi: int | None = None,
+        eu_label: str = "EU average",
+    ) -> bytes:
+        texts = self.legend.get_texts()
+        for line, text, name, vals in zip(self.country_lines, texts, geo_areas, c_mat):
+            line.set_ydata(vals)
+            text.set_text(name)
+        if self.eu_line is not None:
+            self.eu_line.set_ydata(eu_vals)
+            texts[-1].set_text(eu_label)
+
+        self.ax.set_ylim(*ylim)
+
+        self.fig.tight_layout()
+        return figure_bytes(self.fig, fmt, dpi)
+
+
+_overlay_templates = TemplatePool(lambda key: _OverlayTemplate(*key))
 
 
 def plot_time_line_graph(
@@ -51,50 +211,32 @@ def plot_time_line_graph(
     geo_area: str,
     show_eu: bool = False,
     fixed_scale: bool = False,
+    fmt: str = "png",
+    dpi: int | None = None,
+    compare=(),
+    overlay: CountryGroup | None = None,
 ) -> BytesIO:
 
-    years, c_vals, eu_vals = _compute_series(df, geo_area)
+    if compare:
+        return _plot_overlay(df, [geo_area, *compare], show_eu, fixed_scale, fmt, dpi, overlay)
 
-    fig, ax = plt.subplots(figsize=(BASE_WIDTH, BASE_HEIGHT_GRAPH))
+    years, c_vals, eu_vals = _compute_series(df, geo_area, overlay)
+    ylim = timeline_ylim(c_vals, eu_vals, fixed_scale)
 
-    ax.plot(years, c_vals, marker="o", linewidth=2, label=geo_area)
+    with _templates.checkout(bool(show_eu)) as template:
+        data = template.render(geo_area, c_vals, eu_vals, ylim, fmt, dpi, overlay_label(overlay))
 
-    if show_eu:
-        ax.plot(
-            years,
-            eu_vals,
-            marker="o",
-            linestyle="--",
-            linewidth=2,
-            color=EU_COLOR,
-            label="EU average",
-        )
-
-    ax.set_xlabel("Year", fontsize=AXIS_LABEL_SIZE, labelpad=X_LABEL_PADDING)
-    ax.set_ylabel("Happiness (ladder) score", fontsize=AXIS_LABEL_SIZE)
-
-    ax.tick_params(axis="both", labelsize=TICK_SIZE)
-    ax.set_xticks(years)
+    return BytesIO(data)
 
-    if fixed_scale:
-        ax.set_ylim(FIXED_GRAPH_MIN, FIXED_GRAPH_MAX)
-    else:
-        ymin = min(c_vals + eu_vals)
-        ymax = max(c_vals + eu_vals)
-        ymin = min(ymin, EU_TOTAL_MIN)
-        ymax = max(ymax, EU_TOTAL_MAX)
-        pad = (ymax - ymin) * 0.08
-        ax.set_ylim(ymin - pad, ymax + pad)
-
-    ax.grid(axis="y", linestyle="-", linewidth=1, color="#cccccc")
-    ax.legend(frameon=False, fontsize=TICK_SIZE)
-
-    for spine in ax.spines.values():
-        spine.set_color("#cccccc")
-
-    fig.tight_layout()
-    buf = BytesIO()
-    fig.savefig(buf, format="png", transparent=True)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+
+def _plot_overlay(df, geo_areas, show_eu, fixed_scale, fmt, dpi, overlay=None) -> BytesIO:
+    if len(geo_areas) > MAX_TIMELINE_COUNTRIES:
+        raise ValueError(f"At most {MAX_TIMELINE_COUNTRIES} countries per timeline")
+
+    years, c_mat, eu_vals = compute_series_many(df, geo_areas, overlay)
+    ylim = timeline_ylim(c_mat.ravel(), eu_vals, fixed_scale)
+
+    with _overlay_templates.checkout((bool(show_eu), len(geo_areas))) as template:
+        data = template.render(geo_areas, c_mat, eu_vals, ylim, fmt, dpi, overlay_label(overlay))
+
+    return BytesIO(data)
@@ -0,0 +1,139 @@
+# helpers/cache_helpers.py
+
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Event, Lock
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+
+class LRUCache:
+    """
+    Small thread-safe, size-bounded LRU cache.
+    Used for rendered chart bytes; safe to share across the threadpool
+    that runs FastAPI's sync handlers.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = max(0, int(maxsize))
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get, but leaves the hit/miss counters and recency alone."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs fn,
+    everyone arriving while it is in flight waits and shares its result
+    (or its exception). Nothing is remembered once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+def dataset_version(df: pd.DataFrame) -> str:
+    """
+    Short content hash of a frame. Part of every cache key so a reload
+    with different data can never serve stale images.
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    col_names = "|".join(map(str, df.columns)).encode("utf-8")
+    return sha1(row_hashes.tobytes() + col_names).hexdigest()[:12]
@@ -0,0 +1,62 @@
+# country_dimension.py
+#
+# Dense integer country keys. The ETL writes a country dimension table
+# (country_id, country, region, iso2, EU membership, population) next to
+# wh, and stores wh's country/region columns as categoricals whose codes
+# are those ids. Runtime code filters and groups on the integer codes
+# rather than re-stripping and comparing strings on every request.
+
+import numpy as np
+import pandas as pd
+
+from helpers.country_resolver import COUNTRY_ISO2
+
+
+def build_country_dimension(wh: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (wh with a country_id column and categorical country/region, the
+    dimension table). Ids are positions in alphabetical order of name.
+    """
+    wh = wh[wh["country"].notna()].drop(columns="country_id", errors="ignore")
+    names = wh["country"].astype(str).str.strip()
+    categories = sorted(names.unique())
+    wh["country"] = pd.Categorical(names, categories=categories)
+    wh.insert(0, "country_id", wh["country"].cat.codes.astype("int16"))
+
+    if "region" in wh.columns:
+        regions = wh["region"].astype("string").str.strip()
+        wh["region"] = pd.Categorical(regions, categories=sorted(regions.dropna().unique()))
+
+    first = wh.groupby("country_id", sort=True).first()
+    dim = pd.DataFrame({
+        "country_id": np.arange(len(categories), dtype="int16"),
+        "country": pd.Categorical(categories, categories=categories),
+    })
+    dim["iso2"] = dim["country"].map(COUNTRY_ISO2).astype("string")
+    for col in ("region", "population", "population_EU_only"):
+        if col in first.columns:
+            dim[col] = first[col].reindex(dim["country_id"]).to_numpy()
+    if "region" in dim.columns:
+        dim["region"] = pd.Categorical(dim["region"], categories=wh["region"].cat.categories)
+    dim["is_eu"] = dim["population_EU_only"].notna() if "population_EU_only" in dim.columns else False
+    return wh, dim
+
+
+def country_codes(df: pd.DataFrame) -> tuple[np.ndarray, list[str]]:
+    """
+    (integer code per row, names by code) for df's country column; -1 marks
+    missing or blank names. Categorical columns (from the ETL) are read as
+    is; anything else is stripped and factorized once.
+    """
+    col = df["country"]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        names = [str(c).strip() for c in col.cat.categories]
+        codes = col.cat.codes.to_numpy().astype(np.int64)
+        blank = [i for i, name in enumerate(names) if not name]
+        if blank:
+            codes = np.where(np.isin(codes, blank), -1, codes)
+        return codes, names
+
+    stripped = col.astype("string").str.strip()
+    codes, uniques = pd.factorize(stripped.mask(stripped == ""), use_na_sentinel=True)
+    return codes.astype(np.int64), [str(u) for u in uniques]
@@ -0,0 +1,157 @@
+# country_groups.py
+#
+# Named country groups (Nordics, eurozone, ...) as chart overlays and score
+# card comparisons. Groups come from a JSON config file or the API; their
+# unweighted and population-weighted means are computed for every year and
+# metric with one matrix product over the data cube, and cached per group.
+
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from helpers.cache_helpers import LRUCache
+from helpers.data_cube import EU, DataCube, as_cube
+
+
+@dataclass(frozen=True)
+class CountryGroup:
+    """A resolved overlay group; hashable so it can sit in a ChartSpec."""
+    name: str
+    members: tuple[str, ...]
+    weighted: bool = False
+
+    @property
+    def label(self) -> str:
+        if self.weighted:
+            return f"{self.name} population-weighted average"
+        return f"{self.name} average"
+
+
+def overlay_label(group: CountryGroup | None) -> str:
+    """Legend/title label for an overlay; None is the EU average."""
+    return "EU average" if group is None else group.label
+
+
+def load_country_groups(path: str | Path) -> dict[str, list[str]]:
+    """{"Nordics": ["Denmark", "Finland", "Sweden"], ...}; a missing file means no groups."""
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+        raise ValueError(f"{path} must map group names to lists of country names")
+    return {str(name): [str(c).strip() for c in members] for name, members in data.items()}
+
+
+def group_means(cube: DataCube, groups: list[CountryGroup]) -> np.ndarray:
+    """
+    (groups, years, metrics) means for every group in one pass: a membership
+    (or population-weight) matrix times the cube, divided by the matching
+    weight sums over the non-NaN cells.
+    """
+    weights = np.zeros((len(groups), len(cube.countries)))
+    for g, group in enumerate(groups):
+        idx = cube.country_indices(group.members)
+        weights[g, idx] = cube.weights[idx] if group.weighted else 1.0
+    weights = np.nan_to_num(weights)  # members without a population count for nothing
+
+    flat = cube.values.reshape(len(cube.countries), -1)
+    finite = np.isfinite(flat)
+    num = weights @ np.where(finite, flat, 0.0)
+    den = weights @ finite
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(den > 0, num / den, np.nan)
+    return means.reshape(len(groups), len(cube.years), len(cube.metrics))
+
+
+_means = LRUCache(256)
+
+
+def cached_group_means(cube: DataCube, group: CountryGroup) -> np.ndarray:
+    """(years, metrics) means for one group, computed once per (dataset version, group)."""
+    key = (cube.version, group)
+    hit = _means.get(key)
+    if hit is None:
+        hit = group_means(cube, [group])[0]
+        _means.put(key, hit)
+    return hit
+
+
+def overlay_means(df, group: CountryGroup | None) -> np.ndarray:
+    """(years, metrics) overlay values: the EU average when group is None."""
+    cube = as_cube(df)
+    if group is None:
+        return cube.eu_mean()
+    return cached_group_means(cube, group)
+
+
+class GroupRegistry:
+    """
+    Named groups available to the API: EU, each region, then the config
+    file's groups and any defined at runtime. Members missing from the
+    dataset are dropped (and reported) so a world-wide group still works
+    on the EU-only dataset.
+    """
+
+    def __init__(self, cube: DataCube, groups: dict[str, list[str]] | None = None):
+        self.cube = cube
+        self._lock = threading.Lock()
+        self._groups: dict[str, list[str]] = {EU: cube.eu_countries}
+        for region in sorted({r for r in cube.regions if r is not None}):
+            self._groups[region] = [c for c, r in zip(cube.countries, cube.regions) if r == region]
+        self.builtin = set(self._groups)
+        for name, members in (groups or {}).items():
+            self.define(name, members)
+
+    def define(self, name: str, members: list[str]) -> dict[str, Any]:
+        name = str(name).strip()
+        if not name:
+            raise ValueError("Group name must not be empty")
+        if name in self.builtin:
+            raise ValueError(f"'{name}' is a built-in group")
+        members = list(dict.fromkeys(str(m).strip() for m in members if str(m).strip()))
+        if not members:
+            raise ValueError(f"Group '{name}' has no members")
+        with self._lock:
+            self._groups[name] = members
+        return self.describe(name)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._groups)
+
+    def resolve(self, name: str, weighted: bool = False) -> CountryGroup:
+        with self._lock:
+            members = self._groups.get(name)
+        if members is None:
+            raise ValueError(f"Unknown country group '{name}' (groups: {self.names()})")
+        present = tuple(dict.fromkeys(self.cube.country_name(m) for m in members if self.cube.has_country(m)))
+        if not present:
+            raise ValueError(f"No countries of group '{name}' are in the dataset")
+        return CountryGroup(name, present, bool(weighted))
+
+    def describe(self, name: str) -> dict[str, Any]:
+        with self._lock:
+            members = list(self._groups[name])
+        present = list(dict.fromkeys(self.cube.country_name(m) for m in members if self.cube.has_country(m)))
+        return {
+            "name": name,
+            "builtin": name in self.builtin,
+            "members": present,
+            "missing": [m for m in members if not self.cube.has_country(m)],
+        }
+
+    def aggregates(self, name: str, year: int | str, weighted: bool = False) -> dict[str, Any]:
+        group = self.resolve(name, weighted)
+        y = self.cube.year_index(year)
+        means = cached_group_means(self.cube, group)[y]
+        return {
+            "group": name,
+            "weighted": group.weighted,
+            "countries": len(group.members),
+            "metrics": {m: (float(v) if np.isfinite(v) else None) for m, v in zip(self.cube.metrics, means)},
+        }
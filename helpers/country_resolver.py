@@ -0,0 +1,170 @@
+# country_resolver.py
+#
+# One place that turns whatever a client (or a source CSV) calls a country
+# into the name the dataset uses: exact names, known aliases, ISO2 codes,
+# and any case/whitespace/accent/punctuation variant of those. Built once
+# per dataset; a lookup is one dict probe. Unknown names get "did you
+# mean" suggestions from a precomputed trigram index.
+
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+# Other names for dataset countries: World Happiness Report spellings across
+# years, UN/ISO long forms and everyday short forms
+COUNTRY_ALIASES = {
+    "Czechia": "Czech Republic",
+    "Turkiye": "Turkey",
+    "Palestinian Territories": "State of Palestine",
+    "Palestine": "State of Palestine",
+    "Cote d'Ivoire": "Ivory Coast",
+    "Hong Kong": "Hong Kong S.A.R. of China",
+    "Taiwan": "Taiwan Province of China",
+    "Korea": "South Korea",
+    "Republic of Korea": "South Korea",
+    "USA": "United States",
+    "United States of America": "United States",
+    "UK": "United Kingdom",
+    "Great Britain": "United Kingdom",
+    "Britain": "United Kingdom",
+    "Russian Federation": "Russia",
+    "Macedonia": "North Macedonia",
+    "Republic of North Macedonia": "North Macedonia",
+    "Holland": "Netherlands",
+    "UAE": "United Arab Emirates",
+    "Lao PDR": "Laos",
+    "Viet Nam": "Vietnam",
+    "Bosnia": "Bosnia and Herzegovina",
+    "Republic of Moldova": "Moldova",
+    "The Gambia": "Gambia",
+    "Kyrgyz Republic": "Kyrgyzstan",
+    "Slovak Republic": "Slovakia",
+    "Burma": "Myanmar",
+}
+
+COUNTRY_ISO2 = {
+    "Afghanistan": "AF", "Albania": "AL", "Algeria": "DZ", "Argentina": "AR", "Armenia": "AM",
+    "Australia": "AU", "Austria": "AT", "Bahrain": "BH", "Bangladesh": "BD", "Belgium": "BE",
+    "Benin": "BJ", "Bolivia": "BO", "Bosnia and Herzegovina": "BA", "Botswana": "BW", "Brazil": "BR",
+    "Bulgaria": "BG", "Burkina Faso": "BF", "Cambodia": "KH", "Cameroon": "CM", "Canada": "CA",
+    "Chad": "TD", "Chile": "CL", "China": "CN", "Colombia": "CO", "Comoros": "KM",
+    "Costa Rica": "CR", "Croatia": "HR", "Cyprus": "CY", "Czech Republic": "CZ", "Denmark": "DK",
+    "Dominican Republic": "DO", "Ecuador": "EC", "Egypt": "EG", "El Salvador": "SV", "Estonia": "EE",
+    "Ethiopia": "ET", "Finland": "FI", "France": "FR", "Gabon": "GA", "Gambia": "GM",
+    "Georgia": "GE", "Germany": "DE", "Ghana": "GH", "Greece": "GR", "Guatemala": "GT",
+    "Guinea": "GN", "Honduras": "HN", "Hong Kong S.A.R. of China": "HK", "Hungary": "HU", "Iceland": "IS",
+    "India": "IN", "Indonesia": "ID", "Iran": "IR", "Iraq": "IQ", "Ireland": "IE",
+    "Israel": "IL", "Italy": "IT", "Ivory Coast": "CI", "Jamaica": "JM", "Japan": "JP",
+    "Jordan": "JO", "Kazakhstan": "KZ", "Kenya": "KE", "Kosovo": "XK", "Kyrgyzstan": "KG",
+    "Laos": "LA", "Latvia": "LV", "Lebanon": "LB", "Liberia": "LR", "Lithuania": "LT",
+    "Luxembourg": "LU", "Madagascar": "MG", "Malawi": "MW", "Malaysia": "MY", "Mali": "ML",
+    "Malta": "MT", "Mauritania": "MR", "Mauritius": "MU", "Mexico": "MX", "Moldova": "MD",
+    "Mongolia": "MN", "Montenegro": "ME", "Morocco": "MA", "Mozambique": "MZ", "Myanmar": "MM",
+    "Namibia": "NA", "Nepal": "NP", "Netherlands": "NL", "New Zealand": "NZ", "Nicaragua": "NI",
+    "Niger": "NE", "Nigeria": "NG", "North Macedonia": "MK", "Norway": "NO", "Pakistan": "PK",
+    "Panama": "PA", "Paraguay": "PY", "Peru": "PE", "Philippines": "PH", "Poland": "PL",
+    "Portugal": "PT", "Romania": "RO", "Russia": "RU", "Saudi Arabia": "SA", "Senegal": "SN",
+    "Serbia": "RS", "Sierra Leone": "SL", "Singapore": "SG", "Slovakia": "SK", "Slovenia": "SI",
+    "South Africa": "ZA", "South Korea": "KR", "Spain": "ES", "Sri Lanka": "LK", "State of Palestine": "PS",
+    "Sweden": "SE", "Switzerland": "CH", "Taiwan Province of China": "TW", "Tajikistan": "TJ", "Tanzania": "TZ",
+    "Thailand": "TH", "Togo": "TG", "Tunisia": "TN", "Turkey": "TR", "Uganda": "UG",
+    "Ukraine": "UA", "United Arab Emirates": "AE", "United Kingdom": "GB", "United States": "US", "Uruguay": "UY",
+    "Uzbekistan": "UZ", "Venezuela": "VE", "Vietnam": "VN", "Zambia": "ZM", "Zimbabwe": "ZW",
+}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_country_key(name: str) -> str:
+    """'  Côte d’Ivoire ' -> 'cote d ivoire': no accents, case, punctuation or extra spaces."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def canonical_country_name(name: str) -> str:
+    """The dataset spelling for a known alias (for the ETL); other names pass through stripped."""
+    name = str(name).strip()
+    return COUNTRY_ALIASES.get(name, name)
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CountryResolver:
+    """
+    Maps names, aliases, ISO2 codes and their normalized variants to a
+    position in countries. Aliases and codes only count for countries
+    that are actually in the list.
+    """
+
+    def __init__(self, countries: list[str]):
+        self.countries = list(countries)
+        self._keys: dict[str, int] = {}
+
+        # Exact names first so an alias can never shadow a real country
+        for i, name in enumerate(self.countries):
+            self._keys.setdefault(normalize_country_key(name), i)
+        position = {name: i for i, name in enumerate(self.countries)}
+        for alias, name in COUNTRY_ALIASES.items():
+            if name in position:
+                self._keys.setdefault(normalize_country_key(alias), position[name])
+        self._iso2: dict[int, str] = {}
+        for name, code in COUNTRY_ISO2.items():
+            if name in position:
+                self._keys.setdefault(code.casefold(), position[name])
+                self._iso2[position[name]] = code
+
+        # Trigram postings over names and aliases (not codes) for suggestions
+        self._suggest_keys = [k for k in self._keys if len(k) > 2]
+        self._suggest_sizes = np.array([len(_trigrams(k)) for k in self._suggest_keys], dtype=float)
+        self._postings: dict[str, list[int]] = {}
+        for j, key in enumerate(self._suggest_keys):
+            for gram in _trigrams(key):
+                self._postings.setdefault(gram, []).append(j)
+
+    def index(self, name: str) -> int | None:
+        return self._keys.get(normalize_country_key(name))
+
+    def resolve(self, name: str) -> str | None:
+        """The dataset's name for name, or None."""
+        i = self.index(name)
+        return None if i is None else self.countries[i]
+
+    def iso2(self, name: str) -> str | None:
+        i = self.index(name)
+        return None if i is None else self._iso2.get(i)
+
+    def suggest(self, name: str, limit: int = 5, min_score: float = 0.3) -> list[str]:
+        """Closest dataset names by trigram (Dice) similarity; substring matches rank first."""
+        key = normalize_country_key(name)
+        if not key:
+            return []
+        grams = _trigrams(key)
+        shared = Counter(j for gram in grams for j in self._postings.get(gram, ()))
+
+        scored: dict[int, float] = {}
+        for j, n in shared.items():
+            cand = self._suggest_keys[j]
+            score = 2 * n / (len(grams) + self._suggest_sizes[j])
+            if len(key) >= 3 and key in cand:
+                score += 1.0
+            if score < min_score:
+                continue
+            i = self._keys[cand]
+            scored[i] = max(scored.get(i, 0.0), score)
+
+        best = sorted(scored, key=lambda i: (-scored[i], self.countries[i]))
+        return [self.countries[i] for i in best[:limit]]
+
+    def unknown(self, name: str) -> str:
+        """Error text for a name that didn't resolve, with suggestions when there are any."""
+        message = f"No rows found for country '{name}'"
+        maybe = self.suggest(name)
+        if maybe:
+            message += f" (did you mean: {', '.join(maybe)}?)"
+        return message
@@ -0,0 +1,231 @@
+# data_cube.py
+#
+# The wide wh frame as one dense array: country x year x metric.
+# Built once per DataFrame; chart code looks values up by integer index
+# instead of building "{metric}_{yy}" column names and string-matching
+# the country column on every request.
+
+import re
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from helpers.cache_helpers import dataset_version
+from helpers.country_dimension import country_codes
+from helpers.country_resolver import CountryResolver
+
+# Aggregate groups besides one per region
+EU = "EU"
+ALL = "all"
+STATS = ("mean", "min", "max", "median")
+
+# "GDP_23", "ladder_score_21", ... -> ("GDP", "23")
+_YEAR_COL = re.compile(r"^(?P<metric>.+)_(?P<yy>\d{2})$")
+
+
+class DataCube:
+    """
+    values[c, y, m] is the mean over df rows for countries[c] of the
+    "{metrics[m]}_{yy}" column for years[y] (NaN where missing).
+    eu_mask marks countries with population_EU_only present, regions and
+    population hold the per-country attributes; country_ids are the
+    integer keys of countries and alpha_order their alphabetical order.
+    Countries are looked up through a CountryResolver, so aliases and
+    ISO2 codes work too.
+    version is df's dataset_version, for cache keys derived from the cube.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if "country" not in df.columns:
+            raise ValueError("Expected a 'country' column")
+
+        metrics: list[str] = []
+        years: list[int] = []
+        for col in df.columns:
+            m = _YEAR_COL.match(str(col))
+            if not m:
+                continue
+            if m["metric"] not in metrics:
+                metrics.append(m["metric"])
+            year = 2000 + int(m["yy"])
+            if year not in years:
+                years.append(year)
+        self.version = dataset_version(df)
+        self.metrics = metrics
+        self.years = sorted(years)
+
+        # Integer country keys (the ETL's categorical codes when present)
+        codes, names = country_codes(df)
+        rows = df[codes >= 0]
+        codes = codes[codes >= 0]
+
+        cols = [f"{m}_{str(y)[-2:]}" for y in self.years for m in self.metrics]
+        missing = [c for c in cols if c not in rows.columns]
+        if missing:
+            rows = rows.assign(**{c: np.nan for c in missing})
+
+        # One groupby on the codes, then everything is positional
+        grouped = rows.groupby(codes, sort=False)
+        means = grouped[cols].mean()
+        self.country_ids = means.index.to_numpy()
+        self.countries: list[str] = [names[i] for i in self.country_ids]
+        self.alpha_order = np.argsort(np.array(self.countries, dtype=object), kind="stable")
+        self.resolver = CountryResolver(self.countries)
+        labels = rows.index.to_numpy()
+        self._row_labels = {names[code]: labels[pos] for code, pos in grouped.indices.items()}
+        self._year_pos = {y: i for i, y in enumerate(self.years)}
+        self._metric_pos = {m: i for i, m in enumerate(self.metrics)}
+
+        self.values = np.ascontiguousarray(
+            means.to_numpy(dtype=float).reshape(len(self.countries), len(self.years), len(self.metrics))
+        )
+
+        if "population_EU_only" in rows.columns:
+            self.eu_mask = grouped["population_EU_only"].count().to_numpy() > 0
+        else:
+            self.eu_mask = np.zeros(len(self.countries), dtype=bool)
+
+        if "region" in rows.columns:
+            self.regions = np.array([None if pd.isna(r) else str(r) for r in grouped["region"].first()], dtype=object)
+        else:
+            self.regions = np.full(len(self.countries), None, dtype=object)
+
+        def _first_numeric(col: str) -> np.ndarray:
+            if col not in rows.columns:
+                return np.full(len(self.countries), np.nan)
+            return pd.to_numeric(grouped[col].first(), errors="coerce").to_numpy(dtype=float)
+
+        self.population = _first_numeric("population")
+
+        # Weights for population-weighted aggregates: the EU figure where we
+        # have one (what EU statistics use), world population otherwise
+        population_eu = _first_numeric("population_EU_only")
+        self.weights = np.where(np.isfinite(population_eu), population_eu, self.population)
+
+        self.aggregates = AggregateStore(self)
+
+    # ---- label lookups ----
+
+    def country_index(self, country: str) -> int:
+        i = self.resolver.index(country)
+        if i is None:
+            raise ValueError(self.resolver.unknown(country))
+        return i
+
+    def has_country(self, country: str) -> bool:
+        return self.resolver.index(country) is not None
+
+    def country_name(self, country: str) -> str:
+        """The dataset's spelling of country (which may be an alias or ISO2 code)."""
+        return self.countries[self.country_index(country)]
+
+    def country_rows(self, country: str) -> np.ndarray:
+        """Index labels of the df rows for country."""
+        return self._row_labels[self.country_name(country)]
+
+    def country_indices(self, countries) -> np.ndarray:
+        return np.array([self.country_index(c) for c in countries], dtype=int)
+
+    def year_index(self, year: int | str) -> int:
+        ys = str(year)
+        year_int = 2000 + int(ys) if len(ys) == 2 else int(ys)
+        i = self._year_pos.get(year_int)
+        if i is None:
+            raise ValueError(f"Year {year_int} not available (years: {self.years})")
+        return i
+
+    def metric_index(self, metric: str) -> int:
+        i = self._metric_pos.get(metric)
+        if i is None:
+            raise ValueError(f"Unknown metric '{metric}' (metrics: {self.metrics})")
+        return i
+
+    def metric_indices(self, metrics) -> np.ndarray:
+        return np.array([self.metric_index(m) for m in metrics], dtype=int)
+
+    # ---- slices ----
+
+    @property
+    def eu_countries(self) -> list[str]:
+        return [self.countries[i] for i in np.flatnonzero(self.eu_mask)]
+
+    def eu_mean(self) -> np.ndarray:
+        """(years, metrics) mean over EU countries."""
+        if not self.eu_mask.any():
+            raise ValueError("No EU rows found (population_EU_only is empty)")
+        return self.aggregates.get(EU)
+
+
+class AggregateStore:
+    """
+    mean/min/max/median per (group, year, metric), computed once from the
+    cube. Groups are EU (population_EU_only present), all, and each region.
+    NaNs are skipped like pandas reductions; an all-NaN cell stays NaN.
+    """
+
+    def __init__(self, cube: DataCube):
+        masks = {EU: cube.eu_mask, ALL: np.ones(len(cube.countries), dtype=bool)}
+        for region in sorted({r for r in cube.regions if r is not None}):
+            masks[region] = cube.regions == region
+
+        self.groups = list(masks)
+        self._group_pos = {g: i for i, g in enumerate(self.groups)}
+        self.counts = {g: int(mask.sum()) for g, mask in masks.items()}
+
+        shape = (len(self.groups), len(cube.years), len(cube.metrics))
+        self.stats = {stat: np.full(shape, np.nan) for stat in STATS}
+        for i, mask in enumerate(masks.values()):
+            if not mask.any():
+                continue
+            # Countries on the contiguous last axis: numpy then sums pairwise,
+            # exactly as pandas does per column
+            vals = np.ascontiguousarray(np.moveaxis(cube.values[mask], 0, -1))
+            finite = np.isfinite(vals)
+            n = finite.sum(axis=-1)
+            has = n > 0
+            self.stats["mean"][i] = np.where(has, np.nansum(vals, axis=-1) / np.maximum(n, 1), np.nan)
+            self.stats["min"][i] = np.where(has, np.where(finite, vals, np.inf).min(axis=-1), np.nan)
+            self.stats["max"][i] = np.where(has, np.where(finite, vals, -np.inf).max(axis=-1), np.nan)
+            if has.any():
+                med = np.full(n.shape, np.nan)
+                med[has] = np.nanmedian(vals[has], axis=-1)
+                self.stats["median"][i] = med
+
+        self.cube = cube
+
+    def get(self, group: str = EU, stat: str = "mean") -> np.ndarray:
+        """(years, metrics) array for one group and statistic."""
+        i = self._group_pos.get(group)
+        if i is None:
+            raise ValueError(f"Unknown group '{group}' (groups: {self.groups})")
+        if stat not in self.stats:
+            raise ValueError(f"Unknown statistic '{stat}' (expected one of {list(STATS)})")
+        return self.stats[stat][i]
+
+    def value(self, group: str, year: int | str, metric: str, stat: str = "mean") -> float | None:
+        v = self.get(group, stat)[self.cube.year_index(year), self.cube.metric_index(metric)]
+        return float(v) if np.isfinite(v) else None
+
+
+_lock = threading.Lock()
+_cubes: dict[int, tuple[weakref.ref, DataCube]] = {}
+
+
+def as_cube(df: pd.DataFrame) -> DataCube:
+    """
+    The cube for df, built on first use and reused for as long as df lives.
+    Frames are treated as immutable once loaded (as everywhere in the API).
+    """
+    key = id(df)
+    with _lock:
+        hit = _cubes.get(key)
+        if hit is not None and hit[0]() is df:
+            return hit[1]
+
+    cube = DataCube(df)
+    with _lock:
+        _cubes[key] = (weakref.ref(df), cube)
+        weakref.finalize(df, _cubes.pop, key, None)
+    return cube
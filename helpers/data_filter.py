@@ -1,32 +1,26 @@
+import numpy as np
 import pandas as pd
 
+from helpers.country_dimension import country_codes
+
 def filter_to_eu_only(df):
     """
     Return exactly ONE row per EU member state.
     EU membership is inferred from presence of population_EU_only.
     No duplication. No synthetic aggregate rows.
+    Matching is on integer country codes; categorical country columns
+    (from the ETL) keep their categories, so codes stay the country ids.
     """
+    codes, names = country_codes(df)
 
     # EU member states are those with EU-only population present
-    eu_countries = (
-        df.loc[df["population_EU_only"].notna(), "country"]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .unique()
-    )
-
-    # Keep only valid country rows
-    country_df = df[df["country"].notna()].copy()
-    country_df["country"] = country_df["country"].astype(str).str.strip()
+    eu_codes = np.unique(codes[df["population_EU_only"].notna().to_numpy() & (codes >= 0)])
 
-    eu_country_df = country_df[country_df["country"].isin(eu_countries)].copy()
+    # CRITICAL: ensure one row per country (the first)
+    keep = np.isin(codes, eu_codes) & ~pd.Series(codes).duplicated().to_numpy()
 
-    # CRITICAL: ensure one row per country
-    eu_country_df = (
-        eu_country_df
-        .drop_duplicates(subset=["country"], keep="first")
-        .reset_index(drop=True)
-    )
+    eu_country_df = df[keep].copy()
+    if not isinstance(df["country"].dtype, pd.CategoricalDtype):
+        eu_country_df["country"] = np.array(names, dtype=object)[codes[keep]]
 
-    return eu_country_df
+    return eu_country_df.reset_index(drop=True)
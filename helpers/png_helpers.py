@@ -0,0 +1,55 @@
+# helpers/png_helpers.py
+
+from io import BytesIO
+from threading import Lock
+from typing import Any
+
+from PIL import Image
+
+# The charts use a handful of flat colours plus anti-aliased edges;
+# 64 palette entries keep the edges smooth
+PNG_PALETTE_COLORS = 64
+PNG_COMPRESS_LEVEL = 9
+
+
+def optimize_png(data: bytes, colors: int = PNG_PALETTE_COLORS, compress_level: int = PNG_COMPRESS_LEVEL) -> bytes:
+    """
+    Re-encode an RGBA PNG as an 8-bit palette PNG. Alpha is kept in the
+    palette (tRNS), so transparent chart backgrounds stay transparent.
+    Returns the original bytes if the result isn't smaller.
+    """
+    img = Image.open(BytesIO(data)).convert("RGBA")
+
+    # FASTOCTREE is the built-in quantizer that handles RGBA
+    quantized = img.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+
+    buf = BytesIO()
+    quantized.save(buf, format="PNG", optimize=True, compress_level=compress_level)
+    out = buf.getvalue()
+
+    return out if len(out) < len(data) else data
+
+
+class PngOptimizeStats:
+    """Running before/after byte totals for optimized images."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.images = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    def record(self, before: int, after: int) -> None:
+        with self._lock:
+            self.images += 1
+            self.bytes_before += before
+            self.bytes_after += after
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "images": self.images,
+                "bytes_before": self.bytes_before,
+                "bytes_after": self.bytes_after,
+                "saved_ratio": (1 - self.bytes_after / self.bytes_before) if self.bytes_before else None,
+            }
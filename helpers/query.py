@@ -0,0 +1,287 @@
+# query.py
+#
+# Ad-hoc questions over the loaded dataset as data instead of code:
+# a small declarative spec (scope, filters, selected fields, grouping,
+# aggregate, sort, limit) compiled to array operations on the data cube.
+# Results are cached by (dataset version, normalized spec).
+#
+# A field is one metric in one year, "freedom@2023", or its change
+# between two years, "freedom@2021..2023". "score" is the ladder score.
+
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from helpers.cache_helpers import LRUCache, SingleFlight, dataset_version
+from helpers.country_groups import CountryGroup, GroupRegistry, cached_group_means
+from helpers.data_cube import as_cube
+
+OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+AGGREGATES = ("mean", "min", "max", "median", "count")
+GROUP_BY = ("region",)
+ASC, DESC = "asc", "desc"
+MAX_LIMIT = 1000
+
+METRIC_ALIASES = {"score": "ladder_score"}
+
+_FIELD = re.compile(r"^(?P<metric>[A-Za-z_]+)@(?P<start>\d{2}|\d{4})(?:\.\.(?P<end>\d{2}|\d{4}))?$")
+
+
+@dataclass(frozen=True)
+class Field:
+    """metric at year, or its change from year to end when end is set."""
+    metric: str
+    year: int
+    end: int | None = None
+
+    @property
+    def name(self) -> str:
+        metric = next((a for a, m in METRIC_ALIASES.items() if m == self.metric), self.metric)
+        if self.end is None:
+            return f"{metric}@{self.year}"
+        return f"{metric}@{self.year}..{self.end}"
+
+
+@dataclass(frozen=True)
+class Condition:
+    field: Field
+    op: str
+    value: float | None = None              # compare with a number...
+    group: CountryGroup | None = None       # ...or with a group's mean of the same field
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """A normalized query; every part is hashable so the spec is its own cache key."""
+    select: tuple[Field, ...] = ()
+    where: tuple[Condition, ...] = ()
+    within: CountryGroup | None = None
+    countries: tuple[str, ...] = ()
+    group_by: str | None = None
+    aggregate: str = "mean"
+    sort: str | None = None  # a selected field name, "country"/"region", or "count"
+    order: str = DESC
+    offset: int = 0
+    limit: int = 50
+
+
+def _year(value: str | int) -> int:
+    s = str(value)
+    return 2000 + int(s) if len(s) == 2 else int(s)
+
+
+def _floats(values) -> list[float | None]:
+    return [float(v) if np.isfinite(v) else None for v in np.asarray(values, dtype=float)]
+
+
+class QueryEngine:
+    """
+    Runs queries against one dataset. normalize() validates a raw request
+    (as sent to POST /query) into a QuerySpec; run() evaluates it, or
+    returns the cached result for an equivalent spec.
+    """
+
+    def __init__(self, df: pd.DataFrame, groups: GroupRegistry, cache_size: int = 256):
+        self.cube = as_cube(df)
+        self.groups = groups
+        self.version = dataset_version(df)
+        self.cache = LRUCache(cache_size)
+        self.flight = SingleFlight()
+
+    # ---- normalization ----
+
+    def field(self, text: str) -> Field:
+        m = _FIELD.match(str(text).strip())
+        if not m:
+            raise ValueError(f"Bad field '{text}' (expected metric@year or metric@year..year, e.g. 'freedom@2021..2023')")
+        metric = METRIC_ALIASES.get(m["metric"], m["metric"])
+        self.cube.metric_index(metric)
+        year = _year(m["start"])
+        self.cube.year_index(year)
+        end = None
+        if m["end"] is not None:
+            end = _year(m["end"])
+            self.cube.year_index(end)
+        return Field(metric, year, end)
+
+    def normalize(self, request: dict[str, Any]) -> QuerySpec:
+        where = []
+        for cond in request.get("filter") or ():
+            op = cond.get("op", ">")
+            if op not in OPS:
+                raise ValueError(f"Unknown operator '{op}' (expected one of {list(OPS)})")
+            field = self.field(cond["field"])
+            value = cond.get("value")
+            if isinstance(value, str):
+                group = self.groups.resolve(value, bool(cond.get("weighted", False)))
+                where.append(Condition(field, op, group=group))
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                where.append(Condition(field, op, value=float(value)))
+            else:
+                raise ValueError(f"Filter on {field.name} needs a number or a group name to compare with")
+
+        # Filtered fields are returned too unless the caller picked columns
+        select = [self.field(f) for f in request.get("select") or ()]
+        if not select:
+            select = [c.field for c in where]
+        select = tuple(dict.fromkeys(select))
+
+        within = request.get("within")
+        within = self.groups.resolve(within) if within else None
+        countries = tuple(dict.fromkeys(self.cube.country_name(c) for c in request.get("countries") or ()))
+
+        group_by = request.get("group_by")
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError(f"Can only group by {list(GROUP_BY)}, not '{group_by}'")
+        aggregate = request.get("aggregate") or "mean"
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}' (expected one of {list(AGGREGATES)})")
+
+        names = [f.name for f in select]
+        sort = request.get("sort")
+        if sort is not None:
+            sort = str(sort).strip()
+            if sort not in names:
+                sort = self.field(sort).name if "@" in sort else sort
+            allowed = [*names, "region", "count"] if group_by else [*names, "country", "region"]
+            if sort not in allowed:
+                raise ValueError(f"Can only sort by {allowed}, not '{sort}'")
+        elif names:
+            sort = names[0]
+        else:
+            sort = "region" if group_by else "country"
+
+        order = request.get("order") or (ASC if sort in ("country", "region") else DESC)
+        if order not in (ASC, DESC):
+            raise ValueError(f"Unknown order '{order}' (expected '{ASC}' or '{DESC}')")
+
+        offset = int(request.get("offset") or 0)
+        limit = int(request.get("limit") or 50)
+        if offset < 0 or not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"Need offset >= 0 and 1 <= limit <= {MAX_LIMIT}")
+
+        return QuerySpec(select, tuple(where), within, countries, group_by, aggregate, sort, order, offset, limit)
+
+    # ---- evaluation ----
+
+    def _column(self, field: Field, values: np.ndarray | None = None) -> np.ndarray:
+        """field over every country (values=None), or over a (years, metrics) slab."""
+        cube = self.cube
+        m = cube.metric_index(field.metric)
+        data = cube.values[:, :, m] if values is None else values[:, m]
+        col = data[..., cube.year_index(field.year)]
+        if field.end is not None:
+            col = data[..., cube.year_index(field.end)] - col
+        return col
+
+    def run(self, spec: QuerySpec) -> dict[str, Any]:
+        key = (self.version, spec)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+
+        def _evaluate():
+            result = self._evaluate(spec)
+            self.cache.put(key, result)
+            return result
+
+        return self.flight.do(key, _evaluate)
+
+    def _evaluate(self, spec: QuerySpec) -> dict[str, Any]:
+        cube = self.cube
+        n = len(cube.countries)
+
+        mask = np.ones(n, dtype=bool)
+        if spec.within is not None:
+            mask &= np.isin(np.arange(n), cube.country_indices(spec.within.members))
+        if spec.countries:
+            mask &= np.isin(np.arange(n), cube.country_indices(spec.countries))
+
+        for cond in spec.where:
+            lhs = self._column(cond.field)
+            if cond.group is not None:
+                rhs = float(self._column(cond.field, cached_group_means(cube, cond.group)))
+            else:
+                rhs = cond.value
+            # Missing values never match, whatever the operator
+            with np.errstate(invalid="ignore"):
+                mask &= np.isfinite(lhs) & OPS[cond.op](lhs, rhs)
+
+        idx = np.flatnonzero(mask)
+        names = [f.name for f in spec.select]
+        cols = {name: self._column(f)[idx] for name, f in zip(names, spec.select)}
+
+        if spec.group_by is None:
+            keys = {"country": np.array(cube.countries, dtype=object)[idx], "region": cube.regions[idx]}
+        else:
+            frame = pd.DataFrame(cols)
+            frame["region"] = cube.regions[idx]
+            frame = frame[frame["region"].notna()]
+            grouped = frame.groupby("region", sort=True)
+            counts = grouped.size()
+            stats = grouped[names].count() if spec.aggregate == "count" else grouped[names].agg(spec.aggregate)
+            keys = {"region": counts.index.to_numpy(dtype=object), "count": counts.to_numpy(dtype=float)}
+            cols = {name: stats[name].to_numpy(dtype=float) for name in names}
+
+        # Stable sort, missing values last in either direction
+        sort_col = keys.get(spec.sort) if spec.sort in keys else cols[spec.sort]
+        if sort_col.dtype == object:
+            order = np.argsort(np.array([str(v) for v in sort_col]), kind="stable")
+            if spec.order == DESC:
+                order = order[::-1]
+        else:
+            finite = np.isfinite(sort_col)
+            keyed = np.where(finite, -sort_col if spec.order == DESC else sort_col, 0.0)
+            order = np.lexsort((keyed, ~finite))
+        page = order[spec.offset:spec.offset + spec.limit]
+
+        columns = [*keys, *names]
+        out_cols = {**{k: v[page] for k, v in keys.items()}, **{k: _floats(v[page]) for k, v in cols.items()}}
+        if "count" in out_cols:
+            out_cols["count"] = [int(v) for v in out_cols["count"]]
+        rows = [dict(zip(columns, vals)) for vals in zip(*(out_cols[c] for c in columns))]
+
+        return {
+            "columns": columns,
+            "rows": rows,
+            "matched": len(idx),
+            "total": len(order),
+            "offset": spec.offset,
+            "limit": spec.limit,
+            "spec": self.describe(spec),
+        }
+
+    def describe(self, spec: QuerySpec) -> dict[str, Any]:
+        """The normalized spec as JSON, so callers can see what was run."""
+        return {
+            "select": [f.name for f in spec.select],
+            "filter": [
+                {
+                    "field": c.field.name,
+                    "op": c.op,
+                    "value": c.value if c.group is None else c.group.name,
+                    **({"weighted": c.group.weighted} if c.group is not None else {}),
+                }
+                for c in spec.where
+            ],
+            "within": spec.within.name if spec.within is not None else None,
+            "countries": list(spec.countries),
+            "group_by": spec.group_by,
+            "aggregate": spec.aggregate,
+            "sort": spec.sort,
+            "order": spec.order,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {"dataset_version": self.version, **self.cache.stats(), "single_flight": self.flight.stats()}
@@ -4,6 +4,8 @@ import pickle
 
 from helpers.data_clean_helpers import *
 from helpers.pickle_helpers import *
+from helpers.country_resolver import canonical_country_name
+from helpers.country_dimension import build_country_dimension
 
 def load_raw_data():
     wh21 = pd.read_csv("./data/world-happiness-report-2021.csv")
@@ -24,12 +26,10 @@ def process_data():
     w_pop = w_pop[["Country", "Population"]].rename(columns={"Country": "country", "Population": "population"})
     eu = eu[["Country", "Population[2]", "Area (km2)"]].rename(columns={"Country": "country", "Population[2]": "population_EU_only", "Area (km2)": "area_km2_EU_only"})
 
-    wh21["country"] = wh21["country"].str.replace("Palestinian Territories", "State of Palestine", regex=False).str.strip()
-    wh22["country"] = wh22["country"].str.replace("Palestinian Territories", "State of Palestine", regex=False).str.strip()
-    wh22["country"] = wh22["country"].str.replace("*", "", regex=False).str.strip()
-    wh22["country"] = wh22["country"].str.replace("Czechia", "Czech Republic", regex=False).str.strip()
-    wh23["country"] = wh23["country"].str.replace("Turkiye", "Turkey", regex=False).str.strip()
-    wh23["country"] = wh23["country"].str.replace("Czechia", "Czech Republic", regex=False).str.strip()
+    # One spelling per country across years (Czechia, Turkiye, Palestinian Territories, ...)
+    wh22["country"] = wh22["country"].str.replace("*", "", regex=False)
+    for frame in (wh21, wh22, wh23, w_pop):
+        frame["country"] = frame["country"].map(canonical_country_name)
 
     check_common_countries(wh21, wh22, wh23)
 
@@ -55,8 +55,8 @@ def process_data():
 
     wh["population_EU_only"] = numeric_object_to_int(wh, "population_EU_only")
     wh["area_km2_EU_only"] = numeric_object_to_int(wh, "area_km2_EU_only")
-    wh.country = wh.country.astype("string")
-    wh.region = wh.region.astype("string")
+    # Dense integer country ids; country/region become categoricals keyed by them
+    wh, countries = build_country_dimension(wh)
 
     # print(wh.head(50))
     print(wh.dtypes)
@@ -64,6 +64,7 @@ def process_data():
     print(wh.region.unique())
 
     write_pickle(wh, "wh")
+    write_pickle(countries, "countries")
 
 
 
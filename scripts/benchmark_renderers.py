@@ -0,0 +1,76 @@
+from pathlib import Path
+import sys
+
+# Ensure repo root is on sys.path (so `import helpers...` works)
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import matplotlib
+matplotlib.use("Agg")
+
+import time
+import tracemalloc
+
+import numpy as np
+from helpers.pickle_helpers import load_pickle
+from helpers.data_filter import filter_to_eu_only
+
+from charts.render_service import ChartSpec, render_chart, CONTRIB_BAR, TIMELINE, ENGINES
+
+# -----------------------------
+# Compare the matplotlib and Pillow chart engines
+# on latency, peak Python memory and output size
+# -----------------------------
+ROUNDS = 3
+
+df = filter_to_eu_only(load_pickle("wh"))
+countries = df["country"].astype(str).str.strip().tolist()
+
+specs = []
+for c in countries:
+    for show_eu in (False, True):
+        specs.append(ChartSpec(CONTRIB_BAR, c, year=2023, show_eu=show_eu))
+        specs.append(ChartSpec(TIMELINE, c, show_eu=show_eu))
+
+results = {}
+
+for engine in ENGINES:
+    engine_specs = [ChartSpec(s.kind, s.geo_area, s.year, s.show_eu, s.fixed_scale, engine).normalized() for s in specs]
+
+    # Warm-up: fonts, templates, imports
+    render_chart(df, engine_specs[0])
+    render_chart(df, engine_specs[1])
+
+    timings = {CONTRIB_BAR: [], TIMELINE: []}
+    sizes = {CONTRIB_BAR: [], TIMELINE: []}
+    for _ in range(ROUNDS):
+        for spec in engine_specs:
+            t0 = time.perf_counter()
+            png = render_chart(df, spec)
+            timings[spec.kind].append(time.perf_counter() - t0)
+            sizes[spec.kind].append(len(png))
+
+    tracemalloc.start()
+    for spec in engine_specs[:8]:
+        render_chart(df, spec)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results[engine] = (timings, sizes, peak)
+
+print(f"{len(specs)} charts x {ROUNDS} rounds per engine\n")
+print(f"{'engine':<12}{'chart':<13}{'median ms':>10}{'p95 ms':>10}{'mean KB':>10}{'py peak MB':>12}")
+for engine, (timings, sizes, peak) in results.items():
+    for kind in (CONTRIB_BAR, TIMELINE):
+        ms = np.array(timings[kind]) * 1000
+        print(
+            f"{engine:<12}{kind:<13}"
+            f"{np.median(ms):>10.1f}{np.percentile(ms, 95):>10.1f}"
+            f"{np.mean(sizes[kind]) / 1024:>10.1f}{peak / 1e6:>12.2f}"
+        )
+
+base = results[ENGINES[0]][0]
+for engine in ENGINES[1:]:
+    for kind in (CONTRIB_BAR, TIMELINE):
+        speedup = np.median(base[kind]) / np.median(results[engine][0][kind])
+        print(f"\n{engine} vs {ENGINES[0]} ({kind}): {speedup:.1f}x faster")
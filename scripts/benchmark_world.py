@@ -0,0 +1,157 @@
+from pathlib import Path
+import sys
+
+# Ensure repo root is on sys.path (so `import helpers...` works)
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import matplotlib
+matplotlib.use("Agg")
+
+import time
+
+import numpy as np
+import pandas as pd
+from helpers.pickle_helpers import load_pickle
+from helpers.data_cube import DataCube, as_cube
+from helpers.country_groups import GroupRegistry
+
+from charts.render_service import ChartSpec, render_chart, CONTRIB_BAR, TIMELINE, MATPLOTLIB, PIL
+from charts.chart_data import contribution_bar_data, timeline_data
+from charts.score_card import RankingIndex, get_score_card_values, WORLD_SCOPE
+from charts.map_data import build_map_payload
+from charts.choropleth import map_layer, DELTA
+
+# -----------------------------
+# Whole-world mode at scale: the full pickle, and the same data
+# replicated to SCALE times as many countries. Times the startup builds
+# and the per-request chart, ranking and map paths against a budget.
+# Exits non-zero when a median goes over budget, or when a per-request
+# path gets noticeably slower with SCALE times the countries.
+# -----------------------------
+SCALE = 5
+ROUNDS = 30
+
+# Per-request paths may be at most this much slower at SCALE (plus slack
+# for timer noise on sub-millisecond lookups)
+MAX_SLOWDOWN = 1.5
+SLACK_MS = 0.5
+
+# Per-call median budgets in ms (uncached: the render LRU is bypassed)
+BUDGET_MS = {
+    "render contrib_bar (matplotlib)": 250.0,
+    "render timeline (matplotlib)": 250.0,
+    "render contrib_bar (pil)": 100.0,
+    "render timeline (pil)": 100.0,
+    "contrib_bar_data": 2.0,
+    "timeline_data": 2.0,
+    "score card": 1.0,
+    "rankings page": 1.0,
+    "rankings page (region)": 1.0,
+    "group overlay chart data": 2.0,
+    "map layer": 5.0,
+}
+STARTUP_BUDGET_MS = {
+    "data cube": 1000.0,
+    "ranking index": 500.0,
+    "map payload": 1000.0,
+}
+
+
+def replicate(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """
+    scale copies of df with renamed countries and slightly jittered values.
+    Copy k gets ids offset by (k - 1) * n_countries, and country stays a
+    categorical whose codes are those ids, as in the ETL's pickle.
+    """
+    rng = np.random.default_rng(0)
+    keys = ("country_id", "country", "region")
+    numeric = [c for c in df.columns if c not in keys and pd.api.types.is_numeric_dtype(df[c])]
+    names = list(df["country"].cat.categories)
+    copies = [df]
+    for k in range(2, scale + 1):
+        copy = df.copy()
+        copy["country_id"] = (copy["country_id"] + (k - 1) * len(names)).astype("int16")
+        copy[numeric] = copy[numeric] * rng.normal(1.0, 0.02, size=(len(copy), len(numeric)))
+        copies.append(copy)
+    out = pd.concat(copies, ignore_index=True)
+    all_names = [n if k == 1 else f"{n} #{k}" for k in range(1, scale + 1) for n in names]
+    out["country"] = pd.Categorical.from_codes(out["country_id"], categories=all_names)
+    return out
+
+
+def median_ms(fn, rounds: int = ROUNDS) -> float:
+    fn()  # warm-up: templates, fonts, caches keyed on the frame
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+
+def once_ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def run(df: pd.DataFrame) -> dict[str, float]:
+    results = {
+        "data cube": once_ms(lambda: DataCube(df)),
+        "ranking index": once_ms(lambda: RankingIndex(df, WORLD_SCOPE)),
+        "map payload": once_ms(lambda: build_map_payload(df)),
+    }
+    index = RankingIndex(df, WORLD_SCOPE)
+    payload = build_map_payload(df)
+    countries = df["country"].astype(str).tolist()
+    region = index.region_names[0]
+    nordics = GroupRegistry(as_cube(df), {"Nordics": ["Denmark", "Finland", "Sweden"]}).resolve("Nordics", True)
+
+    # Cycle through countries so no single row stays hot
+    picks = iter(np.resize(countries, 10 * ROUNDS * len(BUDGET_MS)))
+
+    for engine in (MATPLOTLIB, PIL):
+        for kind in (CONTRIB_BAR, TIMELINE):
+            year = 2023 if kind == CONTRIB_BAR else None
+            results[f"render {kind} ({engine})"] = median_ms(
+                lambda: render_chart(df, ChartSpec(kind, next(picks), year=year, show_eu=True, engine=engine).normalized()),
+                rounds=10,
+            )
+
+    results["contrib_bar_data"] = median_ms(lambda: contribution_bar_data(df, next(picks), 2023, True))
+    results["timeline_data"] = median_ms(lambda: timeline_data(df, next(picks), True))
+    results["score card"] = median_ms(lambda: get_score_card_values(df, next(picks), 2023, index))
+    results["rankings page"] = median_ms(lambda: index.table(2023, offset=len(countries) // 2, limit=50))
+    results["rankings page (region)"] = median_ms(lambda: index.table(2023, "GDP", region=region, limit=50))
+    results["group overlay chart data"] = median_ms(lambda: timeline_data(df, next(picks), True, overlay=nordics))
+    results["map layer"] = median_ms(lambda: map_layer(payload, 2023, "GDP", DELTA))
+    return results
+
+
+world = load_pickle("wh")
+datasets = {
+    f"world x1 ({world['country'].nunique()} countries)": world,
+}
+big = replicate(world, SCALE)
+datasets[f"world x{SCALE} ({big['country'].nunique()} countries)"] = big
+
+all_results = {name: run(df) for name, df in datasets.items()}
+
+budgets = {**STARTUP_BUDGET_MS, **BUDGET_MS}
+names = list(all_results)
+print(f"{'path':<34}" + "".join(f"{n.split(' (')[0]:>14}" for n in names) + f"{'budget':>10}")
+over = []
+for path, budget in budgets.items():
+    row = [all_results[n][path] for n in names]
+    print(f"{path:<34}" + "".join(f"{v:>13.2f} " for v in row) + f"{budget:>10.1f}")
+    over += [f"{path} on {n}: over budget" for n, v in zip(names, row) if v > budget]
+    if path in BUDGET_MS and row[-1] > row[0] * MAX_SLOWDOWN + SLACK_MS:
+        over.append(f"{path}: {row[-1] / row[0]:.1f}x slower at x{SCALE}")
+
+print("\nms: medians for per-request paths, single build for startup paths")
+if over:
+    for line in over:
+        print(f"FAIL: {line}")
+    sys.exit(1)
+print(f"all paths within budget, per-request paths flat at x{SCALE}")
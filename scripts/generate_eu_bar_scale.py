@@ -7,6 +7,7 @@ sys.path.insert(0, str(REPO_ROOT))
 
 import numpy as np
 from helpers.pickle_helpers import load_pickle
+from helpers.data_cube import EU, as_cube
 
 FACTORS = [
     "GDP",
@@ -19,16 +20,10 @@ FACTORS = [
 ]
 
 df = load_pickle("wh")
-eu_df = df[df["population_EU_only"].notna()]
+cube = as_cube(df)
 
-all_eu_vals = []
-
-for yy in ["21", "22", "23"]:
-    cols = [f"{f}_{yy}" for f in FACTORS]
-    means = eu_df[cols].mean().to_numpy(dtype=float)
-    all_eu_vals.append(means)
-
-all_eu_vals = np.concatenate(all_eu_vals)
+# EU factor means for every year, from the aggregate store
+all_eu_vals = cube.aggregates.get(EU, "mean")[:, cube.metric_indices(FACTORS)].ravel()
 all_eu_vals = all_eu_vals[np.isfinite(all_eu_vals)]
 
 eu_min = float(all_eu_vals.min())